@@ -1,78 +1,194 @@
 import streamlit as st
 import os
-import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import batch_ops
+from directory_index import DirectoryIndex, SORT_KEYS
+from file_transfer import TransferCancelled
+from user_store import UserStore
+from workspace_store import QuotaExceeded, WorkspaceStore
 
 USER_FILE = "users.txt"
+WORKSPACE_DIR = "workspaces"
 
 # User management functions
+@st.cache_resource
+def get_user_store():
+    # One shared, indexed store for every session of this server process.
+    return UserStore(USER_FILE)
+
 def save_user(username, password):
-    with open(USER_FILE, "a") as f:
-        f.write(f"{username},{password}\n")
+    return get_user_store().register(username, password)
 
 def user_exists(username):
-    if not os.path.exists(USER_FILE):
-        return False
-    with open(USER_FILE, "r") as f:
-        for line in f:
-            if line.split(",")[0] == username:
-                return True
-    return False
+    return get_user_store().exists(username)
 
 def check_credentials(username, password):
-    if not os.path.exists(USER_FILE):
-        return False
-    with open(USER_FILE, "r") as f:
-        for line in f:
-            user, pw = line.strip().split(",")
-            if user == username and pw == password:
-                return True
-    return False
-
-# File management functions
-def create_file(filename, content):
+    return get_user_store().check(username, password)
+
+# File management functions: every path is relative to the user's workspace
+@st.cache_resource
+def get_workspace_store():
+    # Per-user namespaces over one shared, deduplicated blob store.
+    return WorkspaceStore(WORKSPACE_DIR)
+
+@st.cache_resource
+def get_directory_index():
+    return DirectoryIndex()
+
+def touched(*paths):
+    # Drop cached listings of the directories an operation changed; an
+    # overwrite does not move the directory mtime on its own.
+    for path in paths:
+        get_directory_index().invalidate(os.path.dirname(os.path.abspath(path)))
+
+def show_usage(user):
+    usage = get_workspace_store().usage(user)
+    st.progress(min(usage["bytes"] / usage["quota"], 1.0) if usage["quota"] else 1.0,
+                text=f"{format_size(usage['bytes'])} of {format_size(usage['quota'])} used, {usage['files']} files")
+
+def browse_files(user):
+    directory = st.text_input("Directory", value="")
+    cols = st.columns(4)
+    query = cols[0].text_input("Search (prefix or glob)")
+    sort = cols[1].selectbox("Sort by", SORT_KEYS)
+    reverse = cols[2].checkbox("Descending")
+    page_size = cols[3].selectbox("Per page", (25, 50, 100, 500), index=2)
+    page = st.number_input("Page", min_value=1, value=1, step=1) - 1
     try:
-        with open(filename, "w") as file:
-            file.write(content)
+        path = get_workspace_store().path(user, directory)
+        rows, total = get_directory_index().page(path, page, page_size, sort, reverse, query)
+    except (FileNotFoundError, NotADirectoryError):
+        st.error(f"Directory '{directory}' not found.")
+        return
+    except Exception as e:
+        st.error(f"Error listing directory: {e}")
+        return
+    for row in rows:
+        row["modified"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["modified"]))
+    st.dataframe(rows, use_container_width=True)
+    pages = max(1, -(-total // page_size))
+    st.caption(f"{total} entries, page {page + 1} of {pages}")
+
+def create_file(user, filename, content):
+    try:
+        touched(get_workspace_store().create(user, filename, content))
         st.success(f"File '{filename}' created successfully.")
+    except QuotaExceeded as e:
+        st.error(str(e))
     except Exception as e:
         st.error(f"Errojjr creating file: {e}")
 
-def delete_file(filename):
+def upload_file(user, upload, filename):
+    try:
+        touched(get_workspace_store().upload(user, filename, upload))
+        st.success(f"File '{filename}' uploaded ({format_size(upload.size)}).")
+    except QuotaExceeded as e:
+        st.error(str(e))
+    except Exception as e:
+        st.error(f"Error uploading file: {e}")
+
+def delete_file(user, filename):
     try:
-        os.remove(filename)
+        touched(get_workspace_store().delete(user, filename))
         st.success(f"File '{filename}' deleted successfully.")
     except FileNotFoundError:
         st.error(f"File '{filename}' not found.")
     except Exception as e:
         st.error(f"Error deleting file: {e}")
 
-def rename_file(old_name, new_name):
+def rename_file(user, old_name, new_name):
     try:
-        os.rename(old_name, new_name)
+        store = get_workspace_store()
+        touched(store.path(user, old_name), store.move(user, old_name, new_name))
         st.success(f"File '{old_name}' renamed to '{new_name}'.")
     except FileNotFoundError:
         st.error(f"File '{old_name}' not found.")
     except Exception as e:
         st.error(f"Error renaming file: {e}")
 
-def copy_file(src, dest):
+@st.cache_resource
+def get_transfer_pool():
+    # Transfers outlive a script rerun, so they run on a shared pool.
+    return ThreadPoolExecutor(max_workers=4)
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def cancel_transfer(cancel, label):
+    cancel.set()
+    st.session_state["transfer_notice"] = f"{label} cancelled."
+
+def run_transfer(label, transfer, src, dest):
+    # The copy runs on a worker thread; this run polls it to draw progress.
+    # Cancel reruns the script, and its callback signals the worker.
+    state = {"done": 0, "total": 0}
+    cancel = threading.Event()
+    future = get_transfer_pool().submit(transfer, src, dest, lambda done, total: state.update(done=done, total=total), cancel)
+    bar = st.progress(0.0, text=label)
+    st.button("Cancel", key=f"cancel_{label}", on_click=cancel_transfer, args=(cancel, label))
+    while not future.done():
+        if state["total"]:
+            bar.progress(min(state["done"] / state["total"], 1.0),
+                         text=f"{label}: {format_size(state['done'])} of {format_size(state['total'])}")
+        time.sleep(0.1)
+    bar.empty()
+    return future.result()
+
+def copy_file(user, src, dest):
+    # Normally just another link to the same blob; the transfer engine only
+    # runs when the filesystem cannot hard-link.
+    store = get_workspace_store()
     try:
-        shutil.copy(src, dest)
+        copy = lambda s, d, progress, cancel: store.copy(user, s, d, progress, cancel)
+        touched(run_transfer(f"Copying '{src}'", copy, src, dest))
         st.success(f"File '{src}' copied to '{dest}'.")
     except FileNotFoundError:
         st.error(f"Source file '{src}' not found.")
+    except QuotaExceeded as e:
+        st.error(str(e))
+    except TransferCancelled:
+        st.warning(f"Copy of '{src}' cancelled.")
     except Exception as e:
         st.error(f"Error copying file: {e}")
 
-def move_file(src, dest):
+def move_file(user, src, dest):
+    # Source and destination share the workspace, so a move is a rename.
     try:
-        shutil.move(src, dest)
+        store = get_workspace_store()
+        touched(store.path(user, src), store.move(user, src, dest))
         st.success(f"File '{src}' moved to '{dest}'.")
     except FileNotFoundError:
         st.error(f"File '{src}' not found.")
     except Exception as e:
         st.error(f"Error moving file: {e}")
 
+def run_batch(user, text, fmt):
+    try:
+        ops = batch_ops.parse_manifest(text, fmt)
+    except ValueError as e:
+        st.error(f"Invalid manifest: {e}")
+        return
+    if not ops:
+        st.warning("The manifest has no operations.")
+        return
+    bar = st.progress(0.0, text=f"Running {len(ops)} operations")
+    store = get_workspace_store()
+    results = batch_ops.execute(ops, progress=lambda done, total: bar.progress(done / total, text=f"{done} of {total} operations"),
+                                run=lambda op: store.apply(user, op), root=store.user_root(user))
+    bar.empty()
+    touched(*(store.path(user, path) for r in results if r["status"] == "ok" for path in (r["src"], r["dest"]) if path))
+    failed = sum(r["status"] != "ok" for r in results)
+    if failed:
+        st.warning(f"{len(results) - failed} operations succeeded, {failed} failed or were skipped.")
+    else:
+        st.success(f"All {len(results)} operations succeeded.")
+    st.dataframe(results, use_container_width=True)
+
 # Streamlit App
 def main():
     st.title("File Management System")
@@ -96,50 +212,90 @@ def main():
         new_username = st.text_input("New Username")
         new_password = st.text_input("New Password", type="password")
         if st.button("Register"):
-            if user_exists(new_username):
-                st.error("Username already exists.")
-            else:
-                save_user(new_username, new_password)
-                st.success("User registered successfully!")
+            try:
+                if save_user(new_username, new_password):
+                    st.success("User registered successfully!")
+                else:
+                    st.error("Username already exists.")
+            except ValueError as e:
+                st.error(str(e))
 
     elif menu == "File Manager":
         if "logged_in" in st.session_state and st.session_state["logged_in"]:
-            st.subheader(f"Welcome, {st.session_state['username']}!")
+            user = st.session_state["username"]
+            st.subheader(f"Welcome, {user}!")
             st.write("Use the options below to manage your files.")
+            try:
+                show_usage(user)
+            except ValueError as e:
+                # Accounts registered before names were validated have no workspace.
+                st.error(str(e))
+                if st.button("Logout"):
+                    st.session_state["logged_in"] = False
+                return
+            if "transfer_notice" in st.session_state:
+                st.warning(st.session_state.pop("transfer_notice"))
+
+            # Directory listing
+            st.write("### Browse Files")
+            browse_files(user)
 
             # File creation
             st.write("### Create File")
             filename = st.text_input("Filename")
             content = st.text_area("Content")
             if st.button("Create File"):
-                create_file(filename, content)
+                create_file(user, filename, content)
+
+            # File upload
+            st.write("### Upload File")
+            uploaded = st.file_uploader("File to upload")
+            upload_name = st.text_input("Save as (defaults to the uploaded name)")
+            if st.button("Upload File"):
+                if uploaded is None:
+                    st.error("Choose a file to upload.")
+                else:
+                    upload_file(user, uploaded, upload_name or uploaded.name)
 
             # File deletion
             st.write("### Delete File")
             del_filename = st.text_input("Filename to Delete")
             if st.button("Delete File"):
-                delete_file(del_filename)
+                delete_file(user, del_filename)
 
             # File renaming
             st.write("### Rename File")
             old_name = st.text_input("Old Filename")
             new_name = st.text_input("New Filename")
             if st.button("Rename File"):
-                rename_file(old_name, new_name)
+                rename_file(user, old_name, new_name)
 
             # File copying
             st.write("### Copy File")
             src = st.text_input("Source File")
             dest = st.text_input("Destination File")
             if st.button("Copy File"):
-                copy_file(src, dest)
+                copy_file(user, src, dest)
 
             # File moving
             st.write("### Move File")
             move_src = st.text_input("Source File to Move")
             move_dest = st.text_input("Destination Path")
             if st.button("Move File"):
-                move_file(move_src, move_dest)
+                move_file(user, move_src, move_dest)
+
+            # Batch operations
+            st.write("### Batch Operations")
+            st.caption("One operation per line as `op,src,dest,content` (op: create, delete, rename, copy, move), "
+                       "or upload a CSV / JSON list of objects with the same fields. Operations on the same "
+                       "paths run in order; the rest run in parallel.")
+            manifest = st.text_area("Manifest (CSV)")
+            upload = st.file_uploader("Or upload a manifest", type=["csv", "json"])
+            if st.button("Run Batch"):
+                if upload is not None:
+                    run_batch(user, upload.getvalue().decode("utf-8"), "json" if upload.name.lower().endswith(".json") else "csv")
+                else:
+                    run_batch(user, manifest, "csv")
 
             # Logout
             if st.button("Logout"):
@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import file_transfer
+
+OPERATIONS = ("create", "delete", "rename", "copy", "move")
+NEEDS_DEST = ("rename", "copy", "move")
+
+######## Manifest: CSV rows "op,src,dest,content" or a JSON list of objects ##########
+def parse_manifest(text, fmt="csv"):
+    if fmt == "json":
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("JSON manifest must be a list of operations.")
+    else:
+        rows = []
+        for fields in csv.reader(io.StringIO(text)):
+            if not fields or not fields[0].strip() or fields[0].strip().startswith("#"):
+                continue
+            if fields[0].strip().lower() == "op":
+                continue  # header row
+            rows.append(dict(zip(("op", "src", "dest", "content"), fields)))
+
+    ops = []
+    for n, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Operation {n}: expected an object.")
+        op = str(row.get("op", "")).strip().lower()
+        src = str(row.get("src", "")).strip()
+        dest = str(row.get("dest") or "").strip()
+        if op not in OPERATIONS:
+            raise ValueError(f"Operation {n}: unknown operation '{op}'.")
+        if not src:
+            raise ValueError(f"Operation {n}: missing source path.")
+        if op in NEEDS_DEST and not dest:
+            raise ValueError(f"Operation {n}: '{op}' needs a destination.")
+        ops.append({"op": op, "src": src, "dest": dest if op in NEEDS_DEST else "", "content": str(row.get("content") or "")})
+    return ops
+
+def _paths(op, root=None):
+    # Paths in a manifest are relative to root (the working directory by default).
+    resolve = lambda p: os.path.abspath(os.path.join(root, p) if root else p)
+    paths = [resolve(op["src"])]
+    if op["dest"]:
+        dest = resolve(op["dest"])
+        paths.append(dest)
+        if op["op"] in ("copy", "move") and os.path.isdir(dest):
+            paths.append(os.path.join(dest, os.path.basename(op["src"])))
+    return paths
+
+def _ancestors(path):
+    parent = os.path.dirname(path)
+    while parent != path:
+        yield parent
+        path, parent = parent, os.path.dirname(parent)
+
+def plan(ops, root=None):
+    # Operations touching the same path, or a path and one of its ancestors,
+    # keep their manifest order; everything else may run concurrently. Each
+    # operation lands in the wave after the latest one it depends on.
+    last = {}   # path -> last operation touching it
+    below = {}  # directory -> last operation touching anything under it
+    waves, wave_of, deps = [], [], []
+    for k, op in enumerate(ops):
+        before = set()
+        paths = _paths(op, root)
+        for path in paths:
+            if path in last:
+                before.add(last[path])
+            if path in below:
+                before.add(below[path])
+            for parent in _ancestors(path):
+                if parent in last:
+                    before.add(last[parent])
+        for path in paths:
+            last[path] = k
+            for parent in _ancestors(path):
+                below[parent] = k
+        wave = 1 + max((wave_of[i] for i in before), default=-1)
+        wave_of.append(wave)
+        deps.append(before)
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(k)
+    return waves, deps
+
+def run_operation(op):
+    kind, src, dest = op["op"], op["src"], op["dest"]
+    if kind == "create":
+        with open(src, "w") as f:
+            f.write(op["content"])
+    elif kind == "delete":
+        os.remove(src)
+    elif kind == "rename":
+        os.rename(src, dest)
+    elif kind == "copy":
+        file_transfer.copy_file(src, dest)
+    else:
+        file_transfer.move_file(src, dest)
+
+def execute(ops, workers=8, progress=None, run=run_operation, root=None):
+    # Runs the plan wave by wave on a thread pool and returns one result row
+    # per operation, in manifest order. An operation whose dependency failed
+    # is skipped. progress(done, total) is called from the calling thread.
+    # run(op) performs one operation, e.g. inside a user's workspace.
+    waves, deps = plan(ops, root)
+    results = [None] * len(ops)
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for wave in waves:
+            futures = {}
+            for k in wave:
+                failed = sorted(i + 1 for i in deps[k] if results[i]["status"] != "ok")
+                if failed:
+                    results[k] = _result(k, ops[k], "skipped", f"depends on failed operation {', '.join(map(str, failed))}")
+                    done += 1
+                    if progress is not None:
+                        progress(done, len(ops))
+                else:
+                    futures[pool.submit(run, ops[k])] = k
+            for future in as_completed(futures):
+                k = futures[future]
+                error = future.exception()
+                results[k] = _result(k, ops[k], "error" if error else "ok", str(error) if error else "")
+                done += 1
+                if progress is not None:
+                    progress(done, len(ops))
+    return results
+
+def _result(k, op, status, message):
+    return {"#": k + 1, "op": op["op"], "src": op["src"], "dest": op["dest"], "status": status, "message": message}
@@ -0,0 +1,154 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from deadlock_core import DeadlockManager, sparse_rows
+
+KINDS = ("safe", "cycle", "many_cycles", "random")
+ALGORITHMS = ("detect_multi", "detect_single", "prevent", "recover")
+
+######## Seeded synthetic snapshots ##########
+def generate_snapshot(kind, num_processes, num_resources, seed=0, density=0.1, cycle_length=3):
+    rng = random.Random(seed)
+    p, r = num_processes, num_resources
+    alloc = [[0] * r for _ in range(p)]
+    req = [[0] * r for _ in range(p)]
+
+    def scatter(matrix, high):
+        # Each process touches about density * R resource types.
+        per_row = max(1, int(density * r))
+        for row in matrix:
+            for j in rng.sample(range(r), min(per_row, r)):
+                row[j] = rng.randint(1, high)
+
+    if kind == "safe":
+        # Draw each request within the work available at its turn of a random order.
+        scatter(alloc, 3)
+        avail = [rng.randint(1, 3) for _ in range(r)]
+        work = avail[:]
+        order = list(range(p))
+        rng.shuffle(order)
+        per_row = max(1, int(density * r))
+        for i in order:
+            for j in rng.sample(range(r), min(per_row, r)):
+                req[i][j] = rng.randint(0, work[j])
+            for j in range(r):
+                work[j] += alloc[i][j]
+    elif kind in ("cycle", "many_cycles"):
+        # P_i holds one unit of its own resource and waits for the next one in
+        # its ring: one ring over every process, or many rings of cycle_length.
+        length = p if kind == "cycle" else max(2, cycle_length)
+        for i in range(p):
+            start = i - i % length
+            nxt = start + (i - start + 1) % min(length, p - start)
+            alloc[i][i % r] = 1
+            req[i][nxt % r] = 1
+        avail = [0] * r
+    elif kind == "random":
+        scatter(alloc, 3)
+        scatter(req, 3)
+        avail = [rng.randint(0, 3) for _ in range(r)]
+    else:
+        raise ValueError(f"Unknown snapshot kind: {kind}")
+    return alloc, req, avail
+
+def run_algorithm(name, p, r, alloc, req, avail):
+    if name == "detect_multi":
+        return DeadlockManager(p, r, "Multi-Instance", cache_size=0).detect_deadlock(alloc, req, avail)
+    if name == "detect_single":
+        return DeadlockManager(p, r, "Single-Instance", cache_size=0).detect_deadlock(alloc, req, avail)
+    if name == "prevent":
+        return DeadlockManager(p, r, cache_size=0).prevent_deadlock(alloc, req, avail)
+    return DeadlockManager(p, r, cache_size=0).plan_recovery(alloc, req, avail)
+
+def measure(name, p, r, snapshot, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run_algorithm(name, p, r, *snapshot)
+        times.append(time.perf_counter() - started)
+    # Peak memory in a separate run: tracemalloc slows the timed ones down.
+    tracemalloc.start()
+    run_algorithm(name, p, r, *snapshot)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds_min": min(times), "seconds_median": statistics.median(times), "peak_bytes": peak}
+
+def run_suite(sizes, kinds, algorithms, density, repeat, seed, sparse):
+    results = []
+    for p, r in sizes:
+        for kind in kinds:
+            alloc, req, avail = generate_snapshot(kind, p, r, seed, density)
+            if sparse:
+                alloc, req = sparse_rows(alloc), sparse_rows(req)
+            for name in algorithms:
+                record = {"case": f"{kind}-{p}x{r}-d{density}{'-sparse' if sparse else ''}", "algorithm": name,
+                          "kind": kind, "processes": p, "resources": r, "density": density, "sparse": sparse}
+                record.update(measure(name, p, r, (alloc, req, avail), repeat))
+                results.append(record)
+                print(f"{record['case']:<32} {name:<14} {record['seconds_median'] * 1000:10.2f} ms "
+                      f"{record['peak_bytes'] / 1024:10.1f} KiB", file=sys.stderr)
+    return results
+
+def compare(results, baseline, threshold):
+    # Slowdowns of the median time beyond `threshold` times the baseline.
+    previous = {(r["case"], r["algorithm"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["case"], r["algorithm"]))
+        if old and old["seconds_median"] > 0:
+            ratio = r["seconds_median"] / old["seconds_median"]
+            if ratio > threshold:
+                regressions.append({"case": r["case"], "algorithm": r["algorithm"], "ratio": ratio,
+                                    "baseline_seconds": old["seconds_median"], "seconds": r["seconds_median"]})
+    return regressions
+
+def parse_size(text):
+    p, _, r = text.lower().partition("x")
+    return int(p), int(r)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DeadlockManager on synthetic snapshots.")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(100, 10), (1000, 50)], help="PxR sizes, e.g. 1000x50")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--algorithms", nargs="+", choices=ALGORITHMS, default=list(ALGORITHMS))
+    parser.add_argument("--density", type=float, default=0.1, help="fraction of resource types each process touches")
+    parser.add_argument("--sparse", action="store_true", help="pass matrices as sparse per-process rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="JSON results file (default: stdout)")
+    parser.add_argument("--compare", help="baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.kinds, args.algorithms, args.density, max(1, args.repeat), args.seed, args.sparse)
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed, "repeat": args.repeat},
+        "results": results,
+    }
+    status = 0
+    if args.compare:
+        with open(args.compare, "r") as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+        for reg in report["regressions"]:
+            print(f"REGRESSION {reg['case']} {reg['algorithm']}: {reg['ratio']:.2f}x slower", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
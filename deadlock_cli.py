@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from deadlock_core import POLICIES, DeadlockManager
+
+OPERATIONS = ("detect", "prevent", "recover")
+
+######## Input: JSONL snapshots, or a directory of config.json-style files ##########
+def read_snapshots(source, chunk_size):
+    # Yields chunks of (snapshot id, raw JSON text); parsing happens in the workers.
+    chunk = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".json"):
+                with open(os.path.join(source, name), "r") as f:
+                    chunk.append((name, f.read()))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    else:
+        f = sys.stdin if source == "-" else open(source, "r")
+        try:
+            for lineno, line in enumerate(f, 1):
+                if line.strip():
+                    chunk.append((f"{source}:{lineno}", line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    if chunk:
+        yield chunk
+
+def parse_matrix(rows, name):
+    # Config files store cell values as strings; sparse rows arrive with string keys.
+    matrix = []
+    for row in rows:
+        if isinstance(row, dict):
+            matrix.append({int(j): int(v) for j, v in row.items() if int(v)})
+        else:
+            matrix.append([int(v) for v in row])
+    if any(v < 0 for row in matrix for v in (row.values() if isinstance(row, dict) else row)):
+        raise ValueError(f"{name} values cannot be negative.")
+    return matrix
+
+def evaluate(snapshot, op, instance_mode, engine, policy="smallest_request"):
+    alloc = parse_matrix(snapshot["alloc"], "Allocation")
+    req = parse_matrix(snapshot["req"], "Request")
+    avail = [int(v) for v in snapshot["avail"]]
+    if any(v < 0 for v in avail):
+        raise ValueError("Available values cannot be negative.")
+    p = int(snapshot.get("processes", len(alloc)))
+    r = int(snapshot.get("resources", len(avail)))
+    if len(alloc) != p or len(req) != p or len(avail) != r:
+        raise ValueError("Snapshot size mismatch.")
+
+    manager = DeadlockManager(p, r, snapshot.get("instance_mode", instance_mode), engine)
+    if op == "recover":
+        # "cost" is "held" (default), "priority" (uses "priority") or a per-process list.
+        victims, freed, safe_seq = manager.plan_recovery(alloc, req, avail, snapshot.get("cost", "held"),
+                                                         snapshot.get("priority"))
+        return {"victim": victims[0] if victims else None, "victims": victims, "freed": freed, "safe_seq": safe_seq}
+    if op == "prevent":
+        is_safe, safe_seq, deadlocked = manager.prevent_deadlock(alloc, req, avail, policy, snapshot.get("priority"))
+    else:
+        is_safe, safe_seq, deadlocked = manager.detect_deadlock(alloc, req, avail)
+    return {"is_safe": is_safe, "safe_seq": safe_seq, "deadlocked": deadlocked}
+
+def run_chunk(chunk, op, instance_mode, engine, policy):
+    results = []
+    for snapshot_id, raw in chunk:
+        record = {"id": snapshot_id, "op": op}
+        try:
+            snapshot = json.loads(raw)
+            record["id"] = snapshot.get("id", snapshot_id)
+            record.update(evaluate(snapshot, op, instance_mode, engine, policy))
+        except (ValueError, KeyError, TypeError) as e:
+            record["error"] = str(e) or type(e).__name__
+        results.append(record)
+    return results
+
+def stream_results(chunks, workers, op, instance_mode, engine, policy="smallest_request"):
+    # Keep a bounded number of chunks in flight so huge inputs never sit in
+    # memory at once; results come back in input order.
+    if workers == 1:
+        for chunk in chunks:
+            yield from run_chunk(chunk, op, instance_mode, engine, policy)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(run_chunk, chunk, op, instance_mode, engine, policy))
+            if len(pending) >= 4 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch deadlock analysis over snapshot files.")
+    parser.add_argument("source", help="JSONL file of snapshots, '-' for stdin, or a directory of config-format .json files")
+    parser.add_argument("--op", choices=OPERATIONS, default="detect")
+    parser.add_argument("--instance-mode", choices=("Multi-Instance", "Single-Instance"), default="Multi-Instance")
+    parser.add_argument("--engine", choices=("numpy", "worklist", "python"), default="numpy")
+    parser.add_argument("--policy", choices=POLICIES, default="smallest_request",
+                        help="prevention order; 'priority' reads a per-snapshot \"priority\" list")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=64, help="snapshots sent to a worker at a time")
+    parser.add_argument("--output", default="-", help="JSONL output file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.source != "-" and not os.path.exists(args.source):
+        parser.error(f"source '{args.source}' does not exist")
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    total = unsafe = errors = 0
+    try:
+        chunks = read_snapshots(args.source, max(1, args.chunk_size))
+        for record in stream_results(chunks, max(1, args.workers), args.op, args.instance_mode, args.engine, args.policy):
+            total += 1
+            if "error" in record:
+                errors += 1
+            elif record.get("is_safe") is False or record.get("victim"):
+                unsafe += 1
+            out.write(json.dumps(record) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{total} snapshots, {unsafe} unsafe, {errors} errors", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,979 @@
+import hashlib
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+######## Matrix rows: dense lists, or sparse {resource: units} dicts of non-zero entries ##########
+def _items(row):
+    return row.items() if isinstance(row, dict) else enumerate(row)
+
+def _get(row, j):
+    return row.get(j, 0) if isinstance(row, dict) else row[j]
+
+def is_sparse(matrix):
+    return len(matrix) > 0 and isinstance(matrix[0], dict)
+
+def sparse_rows(matrix):
+    return [row if isinstance(row, dict) else {j: v for j, v in enumerate(row) if v} for row in matrix]
+
+def dense_rows(matrix, num_resources):
+    return [[row.get(j, 0) for j in range(num_resources)] if isinstance(row, dict) else list(row) for row in matrix]
+
+def snapshot_key(*parts):
+    # Cheap content hash of a query. Matrices are hashed by their raw bytes
+    # (sparse rows by their items); repr of a large nested list costs more
+    # than the analysis it would save. SHA-256 has hardware support on most
+    # CPUs and hashes large arrays about twice as fast as BLAKE2 here.
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, list) and part and isinstance(part[0], dict):
+            for row in part:
+                h.update(np.fromiter((x for item in sorted(row.items()) for x in item), dtype=np.int64).tobytes())
+                h.update(b";")
+        elif isinstance(part, (list, np.ndarray)):
+            try:
+                arr = np.ascontiguousarray(part if isinstance(part, np.ndarray) else np.asarray(part))
+            except ValueError:  # ragged rows
+                arr = None
+            if arr is None or arr.dtype == object:
+                h.update(repr(part).encode())
+            else:
+                h.update(f"{arr.dtype.str}{arr.shape}".encode())
+                h.update(arr.tobytes())
+        else:
+            h.update(repr(part).encode())
+        h.update(b"|")
+    return h.digest()
+
+def column_totals(matrix, num_resources):
+    totals = [0] * num_resources
+    for row in matrix:
+        for j, v in _items(row):
+            totals[j] += v
+    return totals
+
+######## Instrumentation sinks: each receives one record per manager call ##########
+class MemorySink:
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+class JsonlSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+class CallbackSink:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, record):
+        self.callback(record)
+
+COUNTERS = ("passes", "processes_examined", "comparisons", "wait_for_edges", "dfs_nodes")
+_NO_SPAN = nullcontext()
+
+class _Span:
+    __slots__ = ("spans", "name", "started")
+
+    def __init__(self, spans, name):
+        self.spans = spans
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.spans[self.name] = self.spans.get(self.name, 0.0) + time.perf_counter() - self.started
+
+class _Worklist:
+    # For each resource keep the requesters still blocked on it sorted by
+    # demand, and for each process the number of resources blocking it.
+    # When work[j] grows only the cursor over resource j advances, so every
+    # (process, resource) pair is woken at most once.
+    def __init__(self, alloc, req, work, candidates, key=None, stats=None, trace=None):
+        self.alloc = alloc
+        self.work = work
+        self.stats = stats
+        self.trace = trace  # list to append one schedule step per finished process
+        self.woken = []
+        self.waiting = {}
+        self.blocked = {}
+        ready = []
+        for i in candidates:
+            count = 0
+            for j, v in _items(req[i]):
+                if v > work[j]:
+                    self.waiting.setdefault(j, []).append((v, i))
+                    count += 1
+            if count:
+                self.blocked[i] = count
+            else:
+                ready.append(i)
+        if stats is not None:
+            stats["processes_examined"] += len(self.blocked) + len(ready)
+            stats["comparisons"] += sum(len(req[i]) for i in self.blocked) + sum(len(req[i]) for i in ready)
+        for lst in self.waiting.values():
+            lst.sort()
+        self.cursor = dict.fromkeys(self.waiting, 0)
+
+        if key is None:
+            queue = deque(ready)
+            self.pop, self.push = queue.popleft, queue.append
+        else:
+            queue = [(key(i), i) for i in ready]
+            heapq.heapify(queue)
+            self.pop = lambda: heapq.heappop(queue)[1]
+            self.push = lambda i: heapq.heappush(queue, (key(i), i))
+        self.queue = queue
+
+    def add(self, j, v):
+        work = self.work
+        work[j] += v
+        lst = self.waiting.get(j)
+        if lst is None:
+            return
+        blocked, c = self.blocked, self.cursor[j]
+        while c < len(lst) and lst[c][0] <= work[j]:
+            k = lst[c][1]
+            if k in blocked:
+                blocked[k] -= 1
+                if not blocked[k]:
+                    del blocked[k]
+                    self.push(k)
+                    if self.trace is not None:
+                        self.woken.append(k)
+            c += 1
+        if self.stats is not None:
+            self.stats["comparisons"] += c - self.cursor[j] + 1
+        self.cursor[j] = c
+
+    def remove(self, i):
+        # A terminated process is never woken again.
+        self.blocked.pop(i, None)
+
+    def run(self):
+        if self.stats is not None:
+            self.stats["passes"] += 1
+        order = []
+        while self.queue:
+            i = self.pop()
+            order.append(i)
+            for j, v in _items(self.alloc[i]):
+                if v:
+                    self.add(j, v)
+            if self.trace is not None:
+                self.trace.append({"step": len(self.trace), "process": f'P{i}',
+                                   "released": {f'R{j}': v for j, v in _items(self.alloc[i]) if v},
+                                   "admitted": [f'P{k}' for k in self.woken]})
+                self.woken = []
+        return order
+
+POLICIES = ("smallest_request", "most_freed", "priority")
+
+class DeadlockManager:
+    def __init__(self, num_processes, num_resources, instance_mode="Multi-Instance", engine="numpy", cache_size=0, sink=None):
+        self.p = num_processes
+        self.r = num_resources
+        self.total_alloc = None
+        self.instance_mode = instance_mode  # "Single-Instance" or "Multi-Instance"
+        self.engine = engine  # "numpy" (vectorized), "worklist" (counter-based) or "python" (reference loop)
+        # Results kept in the LRU cache; 0 disables it. Off by default: hashing a
+        # large list-of-lists snapshot costs about as much as the numpy engine.
+        # It pays off for repeated queries on the slower engines or on arrays.
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.sink = sink  # MemorySink, JsonlSink, CallbackSink or None (no instrumentation)
+        self._stats = None
+        self._spans = None
+
+    ######## Instrumentation: counters and phase timings, off unless a sink is set ##########
+    def _phase(self, name):
+        return _NO_SPAN if self._spans is None else _Span(self._spans, name)
+
+    def _count(self, name, n=1):
+        if self._stats is not None:
+            self._stats[name] += n
+
+    def _cached(self, op, args, compute, cache=True):
+        # cache=False still records to the sink; it only skips the lookup.
+        if self.sink is None or self._stats is not None:
+            return self._lookup(op, args, compute, cache)
+        self._stats = dict.fromkeys(COUNTERS, 0)
+        self._spans = {}
+        hits = self._cache_stats["hits"]
+        started = time.perf_counter()
+        try:
+            return self._lookup(op, args, compute, cache)
+        finally:
+            record = {"op": op, "instance_mode": self.instance_mode, "engine": self.engine,
+                      "processes": self.p, "resources": self.r,
+                      "cache_hit": self._cache_stats["hits"] > hits,
+                      "seconds": time.perf_counter() - started,
+                      "counters": self._stats, "spans": self._spans}
+            self._stats = self._spans = None
+            self.sink.emit(record)
+
+    ######## LRU result cache keyed by a content hash of the query ##########
+    def _lookup(self, op, args, compute, cache=True):
+        if not (cache and self.cache_size):
+            return compute()
+        key = snapshot_key(op, self.instance_mode, self.engine, *args)
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            self._cache_stats["hits"] += 1
+        else:
+            self._cache_stats["misses"] += 1
+            result = compute()
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self._cache_stats["evictions"] += 1
+        # Callers get their own lists so they cannot corrupt cached entries.
+        return tuple(list(x) if isinstance(x, list) else x for x in result)
+
+    def cache_info(self):
+        return dict(self._cache_stats, size=len(self._cache), maxsize=self.cache_size)
+
+    def cache_clear(self):
+        self._cache.clear()
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def detect_deadlock(self, alloc, req, avail):
+        return self._cached("detect", (alloc, req, avail), lambda: self._detect_deadlock(alloc, req, avail))
+
+    def _detect_deadlock(self, alloc, req, avail):
+        if self.instance_mode == "Multi-Instance":
+           ######## Multi-Instance: Banker's Algorithm-like safe sequence check     ##########
+            # Sparse rows always go to the worklist, whose cost follows the non-zero count.
+            with self._phase("safety"):
+                if self.engine == "worklist" or is_sparse(alloc) or is_sparse(req):
+                    return self._safety_worklist(alloc, req, avail)
+                if self.engine == "numpy":
+                    return self._safety_numpy(alloc, req, avail)
+                return self._safety_python(alloc, req, avail)
+        else:  # Single-Instance
+            # Single-Instance: wait-for graph cycle detection
+            with self._phase("wait_for_graph"):
+                adj = self._wait_for_graph(alloc, req, avail)
+            with self._phase("scc"):
+                cycles = self._strongly_connected(adj)
+            on_cycle = [i for cycle in cycles for i in cycle]
+
+            # Anything waiting (transitively) on a cycle member never runs either.
+            with self._phase("propagate"):
+                stuck = self._waiting_on(adj, on_cycle)
+            deadlocked = [f'P{i}' for i in range(self.p) if stuck[i]]
+            return len(deadlocked) == 0, [], deadlocked
+
+    def _waiting_on(self, adj, on_cycle):
+        waiters = [[] for _ in range(self.p)]
+        for i in range(self.p):
+            for k in adj[i]:
+                waiters[k].append(i)
+        stuck = [False] * self.p
+        for i in on_cycle:
+            stuck[i] = True
+        queue = deque(on_cycle)
+        while queue:
+            for i in waiters[queue.popleft()]:
+                if not stuck[i]:
+                    stuck[i] = True
+                    queue.append(i)
+        return stuck
+
+    def detect_deadlock_parallel(self, alloc, req, avail, max_workers=None, min_batch_cells=50000):
+        return self._cached("detect_parallel", (alloc, req, avail),
+                            lambda: self._detect_deadlock_parallel(alloc, req, avail, max_workers, min_batch_cells))
+
+    def _detect_deadlock_parallel(self, alloc, req, avail, max_workers, min_batch_cells):
+        # Processes that share no resource type cannot affect each other, so
+        # each connected component of the RAG is analysed on its own and the
+        # results are merged. Small components are packed into batches of at
+        # least min_batch_cells matrix cells to keep pickling overhead low.
+        with self._phase("capacity_check"):
+            if self.instance_mode == "Multi-Instance" and self._over_capacity(alloc, req, avail):
+                return False, [], [f'P{i}' for i in range(self.p)]
+
+        with self._phase("decompose"):
+            batches = self._batches(alloc, req, avail, min_batch_cells)
+        self._count("passes", len(batches))
+
+        with self._phase("analyse"):
+            if len(batches) > 1 and max_workers != 1:
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    results = list(pool.map(_analyse_components, batches, [self.instance_mode] * len(batches), [self.engine] * len(batches)))
+            else:
+                results = [_analyse_components(b, self.instance_mode, self.engine) for b in batches]
+
+        with self._phase("merge"):
+            safe_seq, deadlocked = [], []
+            for seq, dead in results:
+                safe_seq.extend(f'P{i}' for i in seq)
+                deadlocked.extend(dead)
+            deadlocked = [f'P{i}' for i in sorted(deadlocked)]
+        return not deadlocked, safe_seq, deadlocked
+
+    def _batches(self, alloc, req, avail, min_batch_cells):
+        sparse = is_sparse(alloc) or is_sparse(req)
+        batches, batch, cells = [], [], 0
+        for procs, res in sorted(self._components(alloc, req), key=lambda c: len(c[0]) * len(c[1])):
+            if sparse:
+                col = {j: k for k, j in enumerate(res)}
+                sub_alloc = [{col[j]: v for j, v in _items(alloc[i]) if v} for i in procs]
+                sub_req = [{col[j]: v for j, v in _items(req[i]) if v} for i in procs]
+            else:
+                sub_alloc = [[alloc[i][j] for j in res] for i in procs]
+                sub_req = [[req[i][j] for j in res] for i in procs]
+            sub_avail = [avail[j] for j in res]
+            batch.append((procs, sub_alloc, sub_req, sub_avail))
+            cells += len(procs) * max(len(res), 1)
+            if cells >= min_batch_cells:
+                batches.append(batch)
+                batch, cells = [], 0
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _components(self, alloc, req):
+        # Union-find over resource types, joined by every process touching them.
+        parent = list(range(self.r))
+
+        def find(j):
+            while parent[j] != j:
+                parent[j] = parent[parent[j]]
+                j = parent[j]
+            return j
+
+        touched = []
+        for i in range(self.p):
+            if isinstance(alloc[i], dict) or isinstance(req[i], dict):
+                cols = sorted({j for j, v in _items(alloc[i]) if v} | {j for j, v in _items(req[i]) if v})
+            else:
+                cols = [j for j, (a, q) in enumerate(zip(alloc[i], req[i])) if a or q]
+            for j in cols[1:]:
+                a, b = find(cols[0]), find(j)
+                if a != b:
+                    parent[b] = a
+            touched.append(cols)
+
+        groups = {}
+        idle = []
+        for i, cols in enumerate(touched):
+            if cols:
+                groups.setdefault(find(cols[0]), ([], set()))[0].append(i)
+            else:
+                idle.append(i)
+        for j in range(self.r):
+            if find(j) in groups:
+                groups[find(j)][1].add(j)
+        components = [(procs, sorted(res)) for procs, res in groups.values()]
+        if idle:
+            components.append((idle, []))
+        return components
+
+    def deadlock_cycles(self, alloc, req, avail):
+        cycles = self._strongly_connected(self._wait_for_graph(alloc, req, avail))
+        return [[f'P{i}' for i in cycle] for cycle in cycles]
+
+    def _wait_for_graph(self, alloc, req, avail):
+        # Resource -> holder index in one pass, then one edge per blocked request.
+        holder = [None] * self.r
+        for k in range(self.p):
+            for j, v in _items(alloc[k]):
+                if v > 0 and holder[j] is None:
+                    holder[j] = k
+        wait_for = [[] for _ in range(self.p)]
+        for i in range(self.p):
+            for j, v in _items(req[i]):
+                if v > 0 and avail[j] == 0 and holder[j] is not None and _get(alloc[i], j) == 0:
+                    wait_for[i].append(holder[j])
+        if self._stats is not None:
+            self._stats["wait_for_edges"] += sum(len(edges) for edges in wait_for)
+        return wait_for
+
+    def _strongly_connected(self, adj):
+        ########### Iterative Tarjan: every cycle, no recursion limit ##########
+        index = [None] * self.p
+        low = [0] * self.p
+        on_stack = [False] * self.p
+        stack = []
+        cycles = []
+        counter = 0
+        for root in range(self.p):
+            if index[root] is not None:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            frames = [(root, 0)]
+            while frames:
+                v, it = frames[-1]
+                if it < len(adj[v]):
+                    frames[-1] = (v, it + 1)
+                    w = adj[v][it]
+                    if index[w] is None:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        frames.append((w, 0))
+                    elif on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+                frames.pop()
+                if frames:
+                    u = frames[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    if len(component) > 1 or v in adj[v]:
+                        cycles.append(sorted(component))
+        self._count("dfs_nodes", counter)
+        return cycles
+
+    def _safety_python(self, alloc, req, avail):
+        self.total_alloc = [sum(alloc[i][j] for i in range(self.p)) for j in range(self.r)]
+
+        work = avail[:]
+        finish = [False] * self.p
+        safe_seq = []
+
+        if any(avail[j] + self.total_alloc[j] < max(req[i][j] for i in range(self.p)) for j in range(self.r)):
+            return False, [], [f'P{i}' for i in range(self.p)]
+
+        while True:
+            allocated = False
+            if self._stats is not None:
+                self._stats["passes"] += 1
+                self._stats["processes_examined"] += finish.count(False)
+                self._stats["comparisons"] += finish.count(False) * self.r
+            for i in range(self.p):
+                if not finish[i] and all(req[i][j] <= work[j] for j in range(self.r)):
+                    for j in range(self.r):
+                        work[j] += alloc[i][j]
+                    finish[i] = True
+                    safe_seq.append(f'P{i}')
+                    allocated = True
+            if not allocated:
+                break
+
+        deadlocked = [f'P{i}' for i, done in enumerate(finish) if not done]
+        return all(finish), safe_seq, deadlocked
+
+    def _safety_numpy(self, alloc, req, avail):
+        alloc = np.asarray(alloc, dtype=np.int64).reshape(self.p, self.r)
+        req = np.asarray(req, dtype=np.int64).reshape(self.p, self.r)
+        work = np.array(avail, dtype=np.int64).reshape(self.r)
+        total_alloc = alloc.sum(axis=0)
+        self.total_alloc = total_alloc.tolist()
+
+        if self.p and np.any(work + total_alloc < req.max(axis=0)):
+            return False, [], [f'P{i}' for i in range(self.p)]
+
+        # Each round finishes every pending process whose whole request row fits
+        # in work, then returns their allocation in a single column reduction.
+        pending = np.arange(self.p)
+        safe_seq = []
+        while pending.size:
+            if self._stats is not None:
+                self._stats["passes"] += 1
+                self._stats["processes_examined"] += int(pending.size)
+                self._stats["comparisons"] += int(pending.size) * self.r
+            runnable = (req[pending] <= work).all(axis=1)
+            if not runnable.any():
+                break
+            done = pending[runnable]
+            work += alloc[done].sum(axis=0)
+            safe_seq.extend(f'P{i}' for i in done.tolist())
+            pending = pending[~runnable]
+
+        deadlocked = [f'P{i}' for i in pending.tolist()]
+        return not deadlocked, safe_seq, deadlocked
+
+    def _over_capacity(self, alloc, req, avail):
+        # Some process asks for more of a resource than the system owns.
+        self.total_alloc = column_totals(alloc, self.r)
+        for row in req:
+            for j, v in _items(row):
+                if v > avail[j] + self.total_alloc[j]:
+                    return True
+        return False
+
+    def _safety_worklist(self, alloc, req, avail):
+        if self._over_capacity(alloc, req, avail):
+            return False, [], [f'P{i}' for i in range(self.p)]
+
+        order, blocked = self._worklist(alloc, req, avail[:], range(self.p))
+        deadlocked = [f'P{i}' for i in blocked]
+        return not deadlocked, [f'P{i}' for i in order], deadlocked
+
+    def _worklist(self, alloc, req, work, candidates, key=None):
+        worklist = _Worklist(alloc, req, work, candidates, key, self._stats)
+        return worklist.run(), sorted(worklist.blocked)
+
+    def prevent_deadlock(self, alloc, req, avail, policy="smallest_request", priority=None):
+        return self.schedule(alloc, req, avail, policy, priority, trace=False)[:3]
+
+    def schedule(self, alloc, req, avail, policy="smallest_request", priority=None, trace=True):
+        # policy: "smallest_request", "most_freed", "priority" (highest first),
+        # or a callable giving each process index a sort key (smallest first).
+        # Returns is_safe, safe_seq, deadlocked and the step-by-step trace.
+        # A callable can't be hashed by content, so it never hits the cache.
+        return self._cached("prevent", (alloc, req, avail, policy, priority, trace),
+                            lambda: self._prevent_deadlock(alloc, req, avail, policy, priority, trace),
+                            cache=not callable(policy))
+
+    def _prevent_deadlock(self, alloc, req, avail, policy, priority, trace):
+        # Run the ready process the policy prefers, re-admitting blocked ones
+        # as soon as the resources they wait on are freed. Finishing a process
+        # only ever adds to work, so this finds a safe order whenever one
+        # exists, whatever the policy; the policy only picks which one.
+        steps = [] if trace else None
+        with self._phase("safety"):
+            worklist = _Worklist(alloc, req, avail[:], range(self.p), self._policy_key(alloc, req, policy, priority),
+                                 self._stats, steps)
+            order = worklist.run()
+        safe_seq = [f'P{i}' for i in order]
+        deadlocked = [f'P{i}' for i in sorted(worklist.blocked)]
+        return not deadlocked, safe_seq, deadlocked, steps
+
+    def _policy_key(self, alloc, req, policy, priority):
+        if policy == "smallest_request":
+            demand = [sum(v for _, v in _items(row)) for row in req]
+            return demand.__getitem__
+        if policy == "most_freed":
+            freed = [-sum(v for _, v in _items(row)) for row in alloc]
+            return freed.__getitem__
+        if policy == "priority":
+            if priority is None or len(priority) != self.p:
+                raise ValueError("Priority scheduling needs a priority for every process.")
+            rank = [-v for v in priority]
+            return rank.__getitem__
+        if callable(policy):
+            return policy
+        raise ValueError(f"Unknown prevention policy: {policy}")
+
+    def recover_deadlock(self, alloc, req, avail):
+        victims = self.plan_recovery(alloc, req, avail)[0]
+        return victims[0] if victims else None
+
+    def plan_recovery(self, alloc, req, avail, cost="held", priority=None):
+        # cost: "held" (units held), "priority" (terminate low priority first),
+        # a per-process list of weights, or a callable taking the process index.
+        return self._cached("recover", (alloc, req, avail, cost, priority),
+                            lambda: self._plan_recovery(alloc, req, avail, cost, priority),
+                            cache=not callable(cost))
+
+    def _plan_recovery(self, alloc, req, avail, cost, priority):
+        held = [sum(v for _, v in _items(row)) for row in alloc]
+        if cost == "held":
+            weight = held
+        elif cost == "priority":
+            if priority is None:
+                raise ValueError("Priority-based recovery needs a priority for every process.")
+            weight = list(priority)
+        elif callable(cost):
+            weight = [cost(i) for i in range(self.p)]
+        else:
+            weight = list(cost)
+
+        base = avail[:]
+        with self._phase("reduction"):
+            worklist = _Worklist(alloc, req, base, range(self.p), stats=self._stats)
+            safe_seq = worklist.run()
+        stuck = set(worklist.blocked)
+        if not stuck:
+            return [], [0] * self.r, [f'P{i}' for i in safe_seq]
+        finished_work = base[:]
+
+        # Prefer cheap victims whose allocation is actually contended: cost
+        # per held unit of a resource some other stuck process is waiting on.
+        wanted = set(worklist.waiting)
+        def price(i):
+            useful = sum(v for j, v in _items(alloc[i]) if v and j in wanted)
+            return (weight[i] / useful if useful else float("inf"), weight[i], i)
+
+        # Terminate greedily; each victim's allocation is fed into the same
+        # worklist, so only processes waiting on what it held are re-checked.
+        victims = []
+        with self._phase("victim_search"):
+            for i in sorted(stuck, key=price):
+                if not worklist.blocked:
+                    break
+                if i not in worklist.blocked:
+                    continue
+                worklist.remove(i)
+                victims.append(i)
+                for j, v in _items(alloc[i]):
+                    if v:
+                        worklist.add(j, v)
+                worklist.run()
+
+        # Drop victims the rest of the plan no longer needs, most expensive first.
+        # Sparing a victim only matters to the processes sharing a resource
+        # type with it, so each trial re-checks the victim's connected
+        # component rather than every stuck process. A component never
+        # resolves without a victim of its own.
+        with self._phase("prune"):
+            # With two victims there is a single trial, cheaper than the index.
+            if len(victims) > 2:
+                component = self._stuck_components(alloc, req, stuck)
+            else:
+                component = dict.fromkeys(victims, sorted(stuck))
+            kept = set(victims)
+            for i in sorted(victims, key=lambda i: weight[i], reverse=True):
+                if len(kept) == 1:
+                    break
+                members = component[i]
+                trial = [k for k in members if k in kept and k != i]
+                if trial and self._resolves(alloc, req, finished_work, members, trial):
+                    kept.discard(i)
+            victims = [i for i in victims if i in kept]
+
+        work = finished_work[:]
+        freed = [0] * self.r
+        for i in victims:
+            for j, v in _items(alloc[i]):
+                work[j] += v
+                freed[j] += v
+        killed = set(victims)
+        with self._phase("final_order"):
+            safe_seq += self._worklist(alloc, req, work, [i for i in sorted(stuck) if i not in killed])[0]
+        return [f'P{i}' for i in victims], freed, [f'P{i}' for i in safe_seq]
+
+    def _stuck_components(self, alloc, req, stuck):
+        # Processes linked through a resource type they hold or request, found
+        # by walking a resource -> processes index; maps each process to the
+        # sorted member list of its component.
+        users = {}
+        for i in stuck:
+            for row in (alloc[i], req[i]):
+                for j, v in _items(row):
+                    if v:
+                        users.setdefault(j, []).append(i)
+        component = {}
+        for s in sorted(stuck):
+            if s in component:
+                continue
+            members = [s]
+            component[s] = members
+            stack = [s]
+            while stack:
+                i = stack.pop()
+                for row in (alloc[i], req[i]):
+                    for j, v in _items(row):
+                        for k in users.pop(j, ()):
+                            if k not in component:
+                                component[k] = members
+                                members.append(k)
+                                stack.append(k)
+            members.sort()
+        return component
+
+    def _resolves(self, alloc, req, finished_work, stuck, victims):
+        work = finished_work[:]
+        for i in victims:
+            for j, v in _items(alloc[i]):
+                work[j] += v
+        killed = set(victims)
+        return not self._worklist(alloc, req, work, [i for i in stuck if i not in killed])[1]
+
+def _analyse_components(batch, instance_mode, engine):
+    safe_seq, deadlocked = [], []
+    for procs, alloc, req, avail in batch:
+        manager = DeadlockManager(len(procs), len(avail), instance_mode, engine, cache_size=0)
+        _, seq, dead = manager.detect_deadlock(alloc, req, avail)
+        safe_seq.extend(procs[int(label[1:])] for label in seq)
+        deadlocked.extend(procs[int(label[1:])] for label in dead)
+    return safe_seq, deadlocked
+
+class DeadlockTracker(DeadlockManager):
+    # Stateful view of one system: request/allocate/release events update the
+    # matrices, totals and wait-for index in place. The safe order is kept as
+    # a list of processes only; an event re-checks just the columns it
+    # touches (one cumulative sum down the order per column) and the order
+    # is rebuilt only from the first position that actually fails.
+    def __init__(self, num_processes, num_resources, avail, instance_mode="Multi-Instance"):
+        # The safe order is a Banker's-style reduction; there is no incremental
+        # wait-for-graph mode.
+        if instance_mode != "Multi-Instance":
+            raise ValueError("DeadlockTracker only supports Multi-Instance systems.")
+        super().__init__(num_processes, num_resources, instance_mode, engine="worklist")
+        self.load([[0] * num_resources for _ in range(num_processes)],
+                  [[0] * num_resources for _ in range(num_processes)], avail)
+
+    def load(self, alloc, req, avail):
+        if len(avail) != self.r or len(alloc) != self.p or len(req) != self.p:
+            raise ValueError("Snapshot size mismatch.")
+        self.alloc = dense_rows(alloc, self.r)
+        self.req = dense_rows(req, self.r)
+        self.avail = list(avail)
+        # NumPy mirrors of alloc/req for the column checks and rebuilds.
+        self._alloc = np.array(self.alloc, dtype=np.int64).reshape(self.p, self.r)
+        self._req = np.array(self.req, dtype=np.int64).reshape(self.p, self.r)
+        self.total_alloc = column_totals(self.alloc, self.r)
+        self.holders = [{i for i in range(self.p) if self.alloc[i][j] > 0} for j in range(self.r)]
+        self.waiters = [{i for i in range(self.p) if self.req[i][j] > 0} for j in range(self.r)]
+        self.order = []     # finished processes in safe order
+        self._order = np.zeros(0, dtype=np.intp)
+        self.pos = {}
+        self.deadlocked = set(range(self.p))
+        self.work = self.avail[:]  # work vector after the whole order has run
+        self._resume(0)
+
+    @staticmethod
+    def _entries(vec):
+        items = vec.items() if isinstance(vec, dict) else enumerate(vec)
+        return [(j, int(v)) for j, v in items if v]
+
+    def _set(self, name, p, j, v):
+        # name is "alloc" or "req"; the list and its NumPy mirror change together.
+        getattr(self, name)[p][j] = v
+        getattr(self, "_" + name)[p, j] = v
+
+    def _first_failure(self, cols, last):
+        # First position <= last whose process no longer fits the work it sees
+        # in one of cols, or None. Work before position q is avail plus what
+        # the processes ahead of it return.
+        idx = self._order[:last + 1]
+        first = None
+        for j in cols:
+            a = self._alloc[idx, j]
+            bad = np.flatnonzero(self._req[idx, j] > self.avail[j] + np.cumsum(a) - a)
+            if bad.size and (first is None or bad[0] < first):
+                first = int(bad[0])
+        return first
+
+    def request(self, p, vec):
+        entries = self._entries(vec)
+        if any(v < 0 for _, v in entries):
+            raise ValueError("Request values cannot be negative.")
+        for j, v in entries:
+            self._set("req", p, j, self.req[p][j] + v)
+            self.waiters[j].add(p)
+        # Only p's own position sees a bigger request.
+        k = self.pos.get(p)
+        if k is not None and self._first_failure([j for j, _ in entries], k) is not None:
+            self._resume(k)
+
+    def cancel_request(self, p):
+        # Withdrawing a request can only let p finish sooner.
+        for j in range(self.r):
+            if self.req[p][j]:
+                self._set("req", p, j, 0)
+                self.waiters[j].discard(p)
+        if p in self.deadlocked:
+            self._resume(len(self.order))
+
+    def allocate(self, p, vec):
+        entries = self._entries(vec)
+        for j, v in entries:
+            if v < 0 or v > self.avail[j]:
+                raise ValueError(f"Cannot allocate {v} units of R{j} to P{p}: only {self.avail[j]} available.")
+        for j, v in entries:
+            self.avail[j] -= v
+            self._set("alloc", p, j, self.alloc[p][j] + v)
+            self.total_alloc[j] += v
+            self._set("req", p, j, max(0, self.req[p][j] - v))
+            self.holders[j].add(p)
+            if not self.req[p][j]:
+                self.waiters[j].discard(p)
+
+        # Every position up to p's own sees v fewer free units; later ones
+        # get them back when p finishes.
+        k = self.pos.get(p)
+        q = self._first_failure([j for j, _ in entries], len(self.order) - 1 if k is None else k)
+        if q is not None:
+            self._resume(q)
+        elif k is None:
+            for j, v in entries:
+                self.work[j] -= v
+            if all(self.req[p][j] <= self.work[j] for j in range(self.r)):
+                self._resume(len(self.order))
+
+    def release(self, p, vec):
+        entries = self._entries(vec)
+        for j, v in entries:
+            if v < 0 or v > self.alloc[p][j]:
+                raise ValueError(f"P{p} does not hold {v} units of R{j}.")
+        for j, v in entries:
+            self._set("alloc", p, j, self.alloc[p][j] - v)
+            self.avail[j] += v
+            self.total_alloc[j] -= v
+            if not self.alloc[p][j]:
+                self.holders[j].discard(p)
+
+        # Releasing only adds work to the positions before p finishes, so a
+        # safe order stays safe; only blocked processes can be woken.
+        if p in self.pos:
+            return
+        for j, v in entries:
+            self.work[j] += v
+        woken = set()
+        for j, _ in entries:
+            woken.update(self.waiters[j] & self.deadlocked)
+        if any(all(self.req[i][j] <= self.work[j] for j in range(self.r)) for i in woken):
+            self._resume(len(self.order))
+
+    def _resume(self, q0):
+        # Keep order[:q0] and redo the reduction for everything after it in
+        # rounds, as _safety_numpy does: each round finishes every candidate
+        # that fits and returns their allocation at once.
+        work = np.array(self.avail, dtype=np.int64) + self._alloc[self._order[:q0]].sum(axis=0)
+        pending = np.array(self.order[q0:] + sorted(self.deadlocked), dtype=np.intp)
+        for i in self.order[q0:]:
+            del self.pos[i]
+        del self.order[q0:]
+        while pending.size:
+            runnable = (self._req[pending] <= work).all(axis=1)
+            if not runnable.any():
+                break
+            done = pending[runnable]
+            work += self._alloc[done].sum(axis=0)
+            for i in done.tolist():
+                self.pos[i] = len(self.order)
+                self.order.append(i)
+            pending = pending[~runnable]
+        self._order = np.array(self.order, dtype=np.intp)
+        self.work = work.tolist()
+        self.deadlocked = set(pending.tolist())
+
+    def wait_for(self):
+        # Wait-for edges implied by the current holders/waiters index: a
+        # process waits on every holder of an exhausted resource it requests.
+        edges = {}
+        for j in range(self.r):
+            if self.avail[j] == 0 and self.waiters[j]:
+                for i in self.waiters[j]:
+                    if self.alloc[i][j] == 0:
+                        edges.setdefault(i, set()).update(self.holders[j] - {i})
+        return edges
+
+    def status(self):
+        safe_seq = [f'P{i}' for i in self.order]
+        deadlocked = [f'P{i}' for i in sorted(self.deadlocked)]
+        return not deadlocked, safe_seq, deadlocked
+
+class BankersManager(DeadlockManager):
+    # Banker's avoidance: processes declare a Max claim up front and a request
+    # is granted only if the state it leads to is still safe.
+    def __init__(self, num_processes, num_resources, maximum, alloc, avail):
+        super().__init__(num_processes, num_resources, engine="worklist")
+        self.maximum = dense_rows(maximum, self.r)
+        self.alloc = dense_rows(alloc, self.r)
+        self.avail = list(avail)
+        self.need = [[self.maximum[i][j] - self.alloc[i][j] for j in range(self.r)] for i in range(self.p)]
+        if any(x < 0 for row in self.need for x in row):
+            raise ValueError("Allocation exceeds the declared maximum claim.")
+        self._base = None
+
+    def is_safe(self):
+        order, blocked = self._worklist(self.alloc, self.need, self.avail[:], range(self.p))
+        return not blocked, [f'P{i}' for i in order]
+
+    def _prepare(self):
+        # Base safe order plus, for each position k, the headroom: the largest
+        # vector that can be taken from every earlier step's slack
+        # (work - need) and from Available. A request from the process at
+        # position k that fits its headroom keeps the same order safe.
+        if self._base is None:
+            order, blocked = self._worklist(self.alloc, self.need, self.avail[:], range(self.p))
+            if blocked:
+                self._base = (None, None)
+            else:
+                order = np.array(order, dtype=np.int64)
+                alloc = np.asarray(self.alloc, dtype=np.int64).reshape(self.p, self.r)[order]
+                need = np.asarray(self.need, dtype=np.int64).reshape(self.p, self.r)[order]
+                avail = np.array(self.avail, dtype=np.int64).reshape(1, self.r)
+                work = avail + np.cumsum(alloc, axis=0) - alloc
+                headroom = np.minimum.accumulate(np.vstack([avail, work - need]), axis=0)[:self.p]
+                position = np.empty(self.p, dtype=np.int64)
+                position[order] = np.arange(self.p)
+                self._base = (position, headroom)
+        return self._base
+
+    def _grant_is_safe(self, process, vector):
+        for j in range(self.r):
+            self.avail[j] -= vector[j]
+            self.alloc[process][j] += vector[j]
+            self.need[process][j] -= vector[j]
+        safe = not self._worklist(self.alloc, self.need, self.avail[:], range(self.p))[1]
+        for j in range(self.r):
+            self.avail[j] += vector[j]
+            self.alloc[process][j] -= vector[j]
+            self.need[process][j] += vector[j]
+        return safe
+
+    def try_request(self, process, vector):
+        if any(vector[j] > self.need[process][j] for j in range(self.r)):
+            raise ValueError(f"P{process} has exceeded its maximum claim.")
+        if not self.evaluate_requests([(process, vector)])[0]:
+            return False
+        for j in range(self.r):
+            self.avail[j] -= vector[j]
+            self.alloc[process][j] += vector[j]
+            self.need[process][j] -= vector[j]
+        self._base = None
+        return True
+
+    def evaluate_requests(self, requests, first=False):
+        # What-if check of many candidate grants against the current state;
+        # nothing is committed. Candidates that fit the base order's headroom
+        # are decided in one vectorized comparison, the rest fall back to a
+        # full safety check. With first=True only the first grantable
+        # candidate is reported; nothing behind it gets the full check.
+        requests = list(requests)
+        if not requests:
+            return []
+        procs = np.array([i for i, _ in requests], dtype=np.int64)
+        vectors = np.array([v for _, v in requests], dtype=np.int64).reshape(len(requests), self.r)
+        # Only the candidates' need rows; converting all of need would cost
+        # more than the check itself.
+        need = np.array([self.need[i] for i, _ in requests], dtype=np.int64).reshape(len(requests), self.r)
+        avail = np.array(self.avail, dtype=np.int64)
+
+        admissible = (vectors <= need).all(axis=1) & (vectors <= avail).all(axis=1)
+        granted = np.zeros(len(requests), dtype=bool)
+        position, headroom = self._prepare()
+        if position is not None:
+            granted = admissible & (vectors <= headroom[position[procs]]).all(axis=1)
+        for c in np.flatnonzero(admissible & ~granted).tolist():
+            if first and granted[:c].any():
+                break
+            granted[c] = self._grant_is_safe(requests[c][0], vectors[c].tolist())
+        if first and granted.any():
+            k = int(granted.argmax())
+            granted[k + 1:] = False
+        return granted.tolist()
+
+    def release(self, process, vector):
+        if any(vector[j] > self.alloc[process][j] for j in range(self.r)):
+            raise ValueError(f"P{process} does not hold the released resources.")
+        for j in range(self.r):
+            self.avail[j] += vector[j]
+            self.alloc[process][j] -= vector[j]
+            self.need[process][j] += vector[j]
+        self._base = None
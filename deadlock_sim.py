@@ -0,0 +1,223 @@
+import argparse
+import heapq
+import json
+import random
+import sys
+import time
+from collections import deque
+
+from deadlock_core import BankersManager, DeadlockTracker
+
+ARRIVE, REQUEST, RELEASE, CHECK = range(4)
+
+class DeadlockSimulation:
+    # Discrete-event workload: every process repeatedly thinks, acquires its
+    # job's claim in `steps` partial requests, holds it, then releases it all.
+    # "Detection" grants whatever is free and checks for deadlock either every
+    # check_interval time units or, when check_interval is None, on every
+    # blocking request, terminating the planned victims. "Prevention" grants a
+    # request only if Banker's algorithm keeps the state safe.
+    def __init__(self, num_processes, num_resources, capacity, strategy="Detection", check_interval=None,
+                 steps=2, think_time=5.0, hold_time=10.0, seed=0):
+        if strategy not in ("Detection", "Prevention"):
+            raise ValueError("Strategy must be 'Detection' or 'Prevention'.")
+        if len(capacity) != num_resources:
+            raise ValueError("Capacity size mismatch.")
+        self.p = num_processes
+        self.r = num_resources
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self.steps = steps
+        self.think_time = think_time
+        self.hold_time = hold_time
+        self.rng = random.Random(seed)
+
+        self.claim = [[self.rng.randint(0, max(1, c // 2)) for c in capacity] for _ in range(self.p)]
+        self.tracker = DeadlockTracker(self.p, self.r, capacity)
+        self.banker = None
+        if strategy == "Prevention":
+            self.banker = BankersManager(self.p, self.r, self.claim, [[0] * self.r for _ in range(self.p)], capacity)
+
+        self.now = 0.0
+        self.events = []
+        self.seq = 0
+        self.plan = [deque() for _ in range(self.p)]  # remaining partial requests of each job
+        self.pending = [None] * self.p
+        self.blocked = deque()
+        self.blocked_at = {}
+        self.deadlock_since = None
+        self.stats = {"events": 0, "jobs_completed": 0, "jobs_aborted": 0, "checks": 0,
+                      "deadlocks_detected": 0, "detection_delays": [], "blocked_time": 0.0}
+
+    def schedule(self, delay, kind, process=None):
+        self.seq += 1
+        heapq.heappush(self.events, (self.now + delay, self.seq, kind, process))
+
+    def start_job(self, i):
+        # Split the claim into `steps` partial requests at random cut points.
+        parts = [[0] * self.r for _ in range(self.steps)]
+        for j, units in enumerate(self.claim[i]):
+            cuts = sorted(self.rng.randint(0, units) for _ in range(self.steps - 1))
+            for s, (lo, hi) in enumerate(zip([0] + cuts, cuts + [units])):
+                parts[s][j] = hi - lo
+        self.plan[i] = deque(parts)
+        self.schedule(0.0, REQUEST, i)
+
+    def issue_request(self, i):
+        vec = self.plan[i].popleft()
+        self.pending[i] = vec
+        self.tracker.request(i, vec)
+        if not self.try_grant(i):
+            self.blocked.append(i)
+            self.blocked_at[i] = self.now
+            self.note_state()
+            if self.check_interval is None and self.strategy == "Detection":
+                self.check()
+
+    def try_grant(self, i):
+        vec = self.pending[i]
+        if self.banker is not None:
+            if not self.banker.try_request(i, vec):
+                return False
+        elif any(vec[j] > self.tracker.avail[j] for j in range(self.r)):
+            return False
+        self.tracker.allocate(i, vec)
+        self.pending[i] = None
+        if self.plan[i]:
+            self.schedule(0.0, REQUEST, i)
+        else:
+            self.schedule(self.rng.expovariate(1.0 / self.hold_time), RELEASE, i)
+        return True
+
+    def release_all(self, i):
+        held = self.tracker.alloc[i][:]
+        self.tracker.release(i, held)
+        if self.banker is not None:
+            self.banker.release(i, held)
+        self.retry_blocked()
+
+    def grantable(self, candidates):
+        if self.banker is not None:
+            return self.banker.evaluate_requests([(i, self.pending[i]) for i in candidates], first=True)
+        avail = self.tracker.avail
+        return [all(self.pending[i][j] <= avail[j] for j in range(self.r)) for i in candidates]
+
+    def retry_blocked(self):
+        # FIFO, as if each blocked process retried in turn. One check covers
+        # all of them; only a grant changes the state, so only then are the
+        # ones behind it checked again.
+        waiting = list(self.blocked)
+        self.blocked.clear()
+        while waiting:
+            ok = self.grantable(waiting)
+            if not any(ok):
+                self.blocked.extend(waiting)
+                break
+            k = ok.index(True)
+            self.blocked.extend(waiting[:k])
+            i = waiting[k]
+            self.try_grant(i)
+            del self.blocked_at[i]
+            waiting = waiting[k + 1:]
+        self.note_state()
+
+    def note_state(self):
+        # Ground truth for time-to-detection: when the system first deadlocked.
+        if self.tracker.deadlocked:
+            if self.deadlock_since is None:
+                self.deadlock_since = self.now
+        else:
+            self.deadlock_since = None
+
+    def check(self):
+        self.stats["checks"] += 1
+        if not self.tracker.deadlocked:
+            return
+        self.stats["deadlocks_detected"] += 1
+        self.stats["detection_delays"].append(self.now - self.deadlock_since)
+        victims = self.tracker.plan_recovery(self.tracker.alloc, self.tracker.req, self.tracker.avail)[0]
+        for label in victims:
+            i = int(label[1:])
+            self.stats["jobs_aborted"] += 1
+            self.tracker.cancel_request(i)
+            self.pending[i] = None
+            self.plan[i].clear()
+            if i in self.blocked_at:
+                del self.blocked_at[i]
+                self.blocked.remove(i)
+            self.release_all(i)
+            self.schedule(self.rng.expovariate(1.0 / self.think_time), ARRIVE, i)
+        self.note_state()
+
+    def run(self, until):
+        started = time.perf_counter()
+        for i in range(self.p):
+            self.schedule(self.rng.expovariate(1.0 / self.think_time), ARRIVE, i)
+        if self.check_interval is not None and self.strategy == "Detection":
+            self.schedule(self.check_interval, CHECK)
+
+        while self.events and self.events[0][0] <= until:
+            t, _, kind, i = heapq.heappop(self.events)
+            self.stats["blocked_time"] += len(self.blocked) * (t - self.now)
+            self.now = t
+            self.stats["events"] += 1
+            if kind == ARRIVE:
+                self.start_job(i)
+            elif kind == REQUEST:
+                self.issue_request(i)
+            elif kind == RELEASE:
+                self.stats["jobs_completed"] += 1
+                self.release_all(i)
+                self.schedule(self.rng.expovariate(1.0 / self.think_time), ARRIVE, i)
+            else:
+                self.check()
+                self.schedule(self.check_interval, CHECK)
+        self.stats["blocked_time"] += len(self.blocked) * (until - self.now)
+        self.now = until
+        return self.report(time.perf_counter() - started)
+
+    def report(self, wall_time):
+        delays = self.stats["detection_delays"]
+        return {
+            "strategy": self.strategy,
+            "check_interval": self.check_interval,
+            "sim_time": self.now,
+            "events": self.stats["events"],
+            "jobs_completed": self.stats["jobs_completed"],
+            "jobs_aborted": self.stats["jobs_aborted"],
+            "throughput": self.stats["jobs_completed"] / self.now if self.now else 0.0,
+            "checks": self.stats["checks"],
+            "deadlocks_detected": self.stats["deadlocks_detected"],
+            "mean_time_to_detection": sum(delays) / len(delays) if delays else None,
+            "max_time_to_detection": max(delays) if delays else None,
+            "blocked_fraction": self.stats["blocked_time"] / (self.p * self.now) if self.now and self.p else 0.0,
+            "wall_time": wall_time,
+            "events_per_second": self.stats["events"] / wall_time if wall_time else None,
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a deadlock workload and compare handling strategies.")
+    parser.add_argument("--processes", type=int, default=20)
+    parser.add_argument("--resources", type=int, default=5)
+    parser.add_argument("--capacity", type=int, nargs="+", default=[10], help="units per resource type (one value, or one per type)")
+    parser.add_argument("--strategy", nargs="+", choices=("Detection", "Prevention"), default=["Detection"])
+    parser.add_argument("--check-interval", type=float, nargs="+", default=[0.0],
+                        help="time between deadlock checks; 0 checks on every blocking request")
+    parser.add_argument("--steps", type=int, default=2, help="partial requests per job")
+    parser.add_argument("--think-time", type=float, default=5.0)
+    parser.add_argument("--hold-time", type=float, default=10.0)
+    parser.add_argument("--until", type=float, default=10000.0, help="simulated time to run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    capacity = args.capacity * args.resources if len(args.capacity) == 1 else args.capacity
+    # One JSON line per (strategy, interval) combination, all on the same seed.
+    for strategy in args.strategy:
+        for interval in (args.check_interval if strategy == "Detection" else [None]):
+            sim = DeadlockSimulation(args.processes, args.resources, capacity, strategy, interval or None,
+                                     max(1, args.steps), args.think_time, args.hold_time, args.seed)
+            print(json.dumps(sim.run(args.until)))
+            sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
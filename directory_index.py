@@ -0,0 +1,93 @@
+import bisect
+import fnmatch
+import os
+import threading
+from collections import OrderedDict
+
+SORT_KEYS = ("name", "size", "modified")
+
+class DirectoryListing:
+    # One scandir pass over a directory: names sorted once, entry details in
+    # a dict, and size/mtime orders computed the first time they are asked for.
+    def __init__(self, path, mtime_ns):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.entries = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:  # vanished or dangling symlink
+                    continue
+                is_dir = entry.is_dir()
+                self.entries[entry.name] = (is_dir, 0 if is_dir else st.st_size, st.st_mtime)
+        self.names = sorted(self.entries)
+        self._orders = {"name": self.names}
+
+    def order(self, sort):
+        if sort not in self._orders:
+            field = SORT_KEYS.index(sort)
+            self._orders[sort] = sorted(self.names, key=lambda n: self.entries[n][field])
+        return self._orders[sort]
+
+    def search(self, query):
+        # Globs go through fnmatch; anything else is a prefix looked up by
+        # bisecting the sorted names.
+        if any(c in query for c in "*?["):
+            return fnmatch.filter(self.names, query)
+        lo = bisect.bisect_left(self.names, query)
+        hi = bisect.bisect_left(self.names, query + "\U0010ffff")
+        return self.names[lo:hi]
+
+class DirectoryIndex:
+    # Listings cached per directory and rebuilt only when the directory's
+    # mtime changes (entries added, removed or renamed). Edits that keep the
+    # name set, such as overwriting a file, need an explicit invalidate().
+    def __init__(self, max_dirs=64):
+        self.max_dirs = max_dirs
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def listing(self, path):
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is not None and listing.mtime_ns == mtime_ns:
+                self._listings.move_to_end(path)
+                return listing
+        listing = DirectoryListing(path, mtime_ns)
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_dirs:
+                self._listings.popitem(last=False)
+        return listing
+
+    def invalidate(self, path):
+        with self._lock:
+            self._listings.pop(os.path.abspath(path), None)
+
+    def page(self, path, page=0, page_size=100, sort="name", reverse=False, query=""):
+        # Returns (rows for this page, total matching entries).
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        listing = self.listing(path)
+        if query:
+            names = listing.search(query)
+            if sort != "name":
+                field = SORT_KEYS.index(sort)
+                names = sorted(names, key=lambda n: listing.entries[n][field])
+        else:
+            names = listing.order(sort)
+        total = len(names)
+        start = page * page_size
+        if reverse:
+            chosen = names[max(total - start - page_size, 0):max(total - start, 0)][::-1]
+        else:
+            chosen = names[start:start + page_size]
+        rows = []
+        for name in chosen:
+            is_dir, size, mtime = listing.entries[name]
+            rows.append({"name": name, "type": "dir" if is_dir else "file", "size": size, "modified": mtime})
+        return rows, total
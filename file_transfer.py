@@ -0,0 +1,127 @@
+import errno
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNK_SIZE = 8 * 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: share the source's extents (btrfs, XFS, ...)
+
+# errno values meaning "this kernel path does not apply here, try the next one"
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EBADF, errno.EPERM,
+                getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL)}
+
+class TransferCancelled(Exception):
+    pass
+
+def _target(src, dst):
+    # Like shutil.copy/move: a directory destination keeps the source's name.
+    if os.path.isdir(dst):
+        return os.path.join(dst, os.path.basename(src))
+    return dst
+
+def _reflink(src_fd, dst_fd, size, report):
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    report(size)
+    return True
+
+def _kernel_copy(copy, size, chunk_size, report):
+    # copy(count) moves up to count bytes inside the kernel and returns how many.
+    done = 0
+    while done < size:
+        try:
+            n = copy(min(chunk_size, size - done))
+        except OSError as e:
+            if done == 0 and e.errno in _UNSUPPORTED:
+                return False
+            raise
+        if n == 0:
+            break  # source shrank under us; copy what was there
+        done += n
+        report(n)
+    return True
+
+def _chunked_copy(src, dst, chunk_size, report):
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            return True
+        dst.write(view[:n])
+        report(n)
+
+def copy_file(src, dst, progress=None, cancel=None, chunk_size=CHUNK_SIZE):
+    # Copies src to dst, trying reflink, copy_file_range, sendfile and then a
+    # plain buffered loop. progress(done, total) is called after every chunk;
+    # setting the cancel Event aborts with TransferCancelled. Data goes to a
+    # temporary file next to dst that replaces it only once complete, so a
+    # failed or cancelled copy never leaves a partial destination.
+    dst = _target(src, dst)
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    size = os.stat(src).st_size
+    done = 0
+
+    def report(n):
+        nonlocal done
+        if cancel is not None and cancel.is_set():
+            raise TransferCancelled(f"Copy of '{src}' cancelled.")
+        done += n
+        if progress is not None:
+            progress(done, size)
+
+    # A unique temp name: transfers to the same destination may run on
+    # several threads of one process.
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(dst)}.", suffix=".part",
+                               dir=os.path.dirname(os.path.abspath(dst)))
+    try:
+        with os.fdopen(fd, "wb") as fdst, open(src, "rb") as fsrc:
+            report(0)
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            if not _reflink(src_fd, dst_fd, size, report):
+                copied = False
+                if hasattr(os, "copy_file_range"):
+                    copied = _kernel_copy(lambda n: os.copy_file_range(src_fd, dst_fd, n), size, chunk_size, report)
+                if not copied and hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+                    copied = _kernel_copy(lambda n: os.sendfile(dst_fd, src_fd, None, n), size, chunk_size, report)
+                if not copied:
+                    _chunked_copy(fsrc, fdst, chunk_size, report)
+        shutil.copymode(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return dst
+
+def move_file(src, dst, progress=None, cancel=None, chunk_size=CHUNK_SIZE):
+    # A rename when src and dst share a filesystem; otherwise a streamed copy
+    # followed by removing the source.
+    dst = _target(src, dst)
+    try:
+        os.replace(src, dst)
+        return dst
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    if os.path.isdir(src):
+        return shutil.move(src, dst)
+    copy_file(src, dst, progress, cancel, chunk_size)
+    shutil.copystat(src, dst)
+    os.remove(src)
+    return dst
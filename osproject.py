@@ -1,148 +1,347 @@
-import tkinter as tk
-from tkinter import messagebox, ttk
-import ttkbootstrap as tb
-from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
-import networkx as nx
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+import importlib
 import json
-from PIL import Image, ImageTk
-import os 
-import winsound
-
-class DeadlockManager:
-    def __init__(self, num_processes, num_resources, instance_mode="Multi-Instance"):
-        self.p = num_processes
-        self.r = num_resources
-        self.total_alloc = None
-        self.instance_mode = instance_mode  # "Single-Instance" or "Multi-Instance"
-
-    def detect_deadlock(self, alloc, req, avail):
-        if self.instance_mode == "Multi-Instance":
-           ######## Multi-Instance: Banker's Algorithm-like safe sequence check     ##########
-            if self.total_alloc is None:
-                self.total_alloc = [sum(alloc[i][j] for i in range(self.p)) for j in range(self.r)]
-            
-            work = avail[:]
-            finish = [False] * self.p
-            safe_seq = []
-
-            if any(avail[j] + self.total_alloc[j] < max(req[i][j] for i in range(self.p)) for j in range(self.r)):
-                return False, [], [f'P{i}' for i in range(self.p)]
-
-            while True:
-                allocated = False
-                for i in range(self.p):
-                    if not finish[i] and all(req[i][j] <= work[j] for j in range(self.r)):
-                        for j in range(self.r):
-                            work[j] += alloc[i][j]
-                        finish[i] = True
-                        safe_seq.append(f'P{i}')
-                        allocated = True
-                if not allocated:
-                    break
-
-            deadlocked = [f'P{i}' for i, done in enumerate(finish) if not done]
-            return all(finish), safe_seq, deadlocked
-        else:  # Single-Instance
-            # Single-Instance: Simplified wait-for graph cycle detection
-            # Build adjacency list for wait-for graph
-            wait_for = [[] for _ in range(self.p)]
-            for i in range(self.p):
-                for j in range(self.r):
-                    if req[i][j] > 0 and alloc[i][j] == 0 and avail[j] == 0:
-                        # Find which process holds the resource
-                        for k in range(self.p):
-                            if alloc[k][j] > 0:
-                                wait_for[i].append(k)
-                                break
-
-            ########### Detect cycle using DFS ##########
-            visited = [False] * self.p
-            rec_stack = [False] * self.p
-
-            def dfs(node):
-                visited[node] = True
-                rec_stack[node] = True
-                for neighbor in wait_for[node]:
-                    if not visited[neighbor] and dfs(neighbor):
-                        return True
-                    elif rec_stack[neighbor]:
-                        return True
-                rec_stack[node] = False
-                return False
-
-            deadlocked = []
-            for i in range(self.p):
-                if not visited[i]:
-                    if dfs(i):
-                        deadlocked.append(f'P{i}')
-            return len(deadlocked) == 0, [], deadlocked
-
-    def prevent_deadlock(self, alloc, req, avail):
-        # For simplicity, use multi-instance prevention logic
-        work = avail[:]
-        finish = [False] * self.p
-        safe_seq = []
-        ordered_processes = sorted(range(self.p), key=lambda i: sum(req[i]))
-
-        for i in ordered_processes:
-            if all(req[i][j] <= work[j] for j in range(self.r)):
-                for j in range(self.r):
-                    work[j] += alloc[i][j]
-                finish[i] = True
-                safe_seq.append(f'P{i}')
-
-        deadlocked = [f'P{i}' for i, done in enumerate(finish) if not done]
-        return all(finish), safe_seq, deadlocked
-
-    def recover_deadlock(self, alloc, req, avail):
-        deadlocked = self.detect_deadlock(alloc, req, avail)[2]
-        return deadlocked[0] if deadlocked else None
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from deadlock_core import DeadlockManager, sparse_rows, column_totals
+from snapshot_store import SnapshotStore, read_config, write_config
+
+class _LazyModule:
+    # Stands in for a module and imports it on first use, so importing this
+    # file stays fast and needs no display stack until the GUI actually runs.
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+tk = _LazyModule("tkinter")
+messagebox = _LazyModule("tkinter.messagebox")
+filedialog = _LazyModule("tkinter.filedialog")
+simpledialog = _LazyModule("tkinter.simpledialog")
+tb = _LazyModule("ttkbootstrap")
+mfigure = _LazyModule("matplotlib.figure")
+nx = _LazyModule("networkx")
+Image = _LazyModule("PIL.Image")
+ImageTk = _LazyModule("PIL.ImageTk")
+backend_tkagg = _LazyModule("matplotlib.backends.backend_tkagg")
+mcollections = _LazyModule("matplotlib.collections")
+
+def beep(master, frequency=1000, duration=500):
+    # winsound only exists on Windows; elsewhere the Tk bell has to do.
+    try:
+        import winsound
+        winsound.Beep(frequency, duration)
+    except (ImportError, RuntimeError):
+        master.bell()
+
+def parse_matrix_text(text):
+    # CSV, or tab/space separated rows as pasted from a spreadsheet.
+    rows = [re.split(r"[,;\s]+", line.strip()) for line in text.splitlines() if line.strip()]
+    if not rows:
+        raise ValueError("No matrix data found.")
+    if len({len(row) for row in rows}) != 1:
+        raise ValueError("All matrix rows must have the same length.")
+    try:
+        return np.array(rows).astype(np.int64)
+    except ValueError:
+        raise ValueError("Matrix values must be integers.")
+
+def read_matrix_file(path):
+    if path.lower().endswith(".npy"):
+        return np.load(path, allow_pickle=False)
+    with open(path, "r") as f:
+        return parse_matrix_text(f.read())
+
+class MatrixGrid:
+    # Integer matrix editor backed by a numpy array and a "filled" mask. Only
+    # the visible window of cells has Entry widgets; scrolling re-points them.
+    VISIBLE_ROWS = 10
+    VISIBLE_COLS = 10
+
+    def __init__(self, master, rows, cols, row_prefix="P", col_prefix="R"):
+        self.rows, self.cols = rows, cols
+        self.row_prefix, self.col_prefix = row_prefix, col_prefix
+        self.values = np.zeros((rows, cols), dtype=np.int64)
+        self.filled = np.zeros((rows, cols), dtype=bool)
+        self.bad = {}  # (i, j) -> text that is not an integer
+        self.top = self.left = 0
+
+        self.frame = tb.Frame(master)
+        grid = tb.Frame(self.frame)
+        grid.grid(row=0, column=0)
+        shown_rows, shown_cols = min(rows, self.VISIBLE_ROWS), min(cols, self.VISIBLE_COLS)
+        self.col_labels = [tb.Label(grid, width=5, anchor="center") for _ in range(shown_cols)]
+        for c, label in enumerate(self.col_labels):
+            label.grid(row=0, column=c + 1)
+        self.row_labels = [tb.Label(grid, width=6, anchor="e") for _ in range(shown_rows)]
+        self.entries = []
+        for r in range(shown_rows):
+            self.row_labels[r].grid(row=r + 1, column=0, padx=2)
+            row = []
+            for c in range(shown_cols):
+                entry = tb.Entry(grid, width=5)
+                entry.grid(row=r + 1, column=c + 1, padx=2, pady=2)
+                entry.bind("<KeyRelease>", lambda e, r=r, c=c: self.commit(r, c))
+                entry.bind("<FocusOut>", lambda e, r=r, c=c: self.commit(r, c))
+                for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                    entry.bind(sequence, self.on_wheel)
+                row.append(entry)
+            self.entries.append(row)
+
+        self.vbar = self.hbar = None
+        if rows > shown_rows:
+            self.vbar = tb.Scrollbar(self.frame, orient="vertical", command=self.yview)
+            self.vbar.grid(row=0, column=1, sticky="ns")
+        if cols > shown_cols:
+            self.hbar = tb.Scrollbar(self.frame, orient="horizontal", command=self.xview)
+            self.hbar.grid(row=1, column=0, sticky="ew")
+        tools = tb.Frame(self.frame)
+        tools.grid(row=2, column=0, sticky="w", pady=2)
+        tb.Button(tools, text="Import CSV/NPY", command=self.import_file, bootstyle="secondary-outline").pack(side="left", padx=2)
+        tb.Button(tools, text="Paste", command=self.paste, bootstyle="secondary-outline").pack(side="left", padx=2)
+        self.refresh()
+
+    def commit(self, r, c):
+        i, j = self.top + r, self.left + c
+        text = self.entries[r][c].get().strip()
+        self.bad.pop((i, j), None)
+        self.filled[i, j] = False
+        if text:
+            try:
+                self.values[i, j] = int(text)
+                self.filled[i, j] = True
+            except ValueError:
+                self.bad[(i, j)] = text
+
+    def refresh(self):
+        for c, label in enumerate(self.col_labels):
+            label.configure(text=f"{self.col_prefix}{self.left + c}")
+        for r, label in enumerate(self.row_labels):
+            label.configure(text=f"{self.row_prefix}{self.top + r}" if self.row_prefix else "")
+        for r, row in enumerate(self.entries):
+            for c, entry in enumerate(row):
+                i, j = self.top + r, self.left + c
+                text = self.bad.get((i, j), str(self.values[i, j]) if self.filled[i, j] else "")
+                entry.delete(0, tk.END)
+                entry.insert(0, text)
+        if self.vbar is not None:
+            self.vbar.set(self.top / self.rows, (self.top + len(self.entries)) / self.rows)
+        if self.hbar is not None:
+            self.hbar.set(self.left / self.cols, (self.left + len(self.col_labels)) / self.cols)
+
+    @staticmethod
+    def _scroll(args, start, total, shown):
+        if args[0] == "moveto":
+            start = int(float(args[1]) * total)
+        else:
+            start += int(args[1]) * (shown if args[2] == "pages" else 1)
+        return max(0, min(start, total - shown))
+
+    def yview(self, *args):
+        self.top = self._scroll(args, self.top, self.rows, len(self.entries))
+        self.refresh()
+
+    def xview(self, *args):
+        self.left = self._scroll(args, self.left, self.cols, len(self.col_labels))
+        self.refresh()
+
+    def on_wheel(self, event):
+        if self.vbar is not None:
+            self.yview("scroll", -3 if event.num == 4 or event.delta > 0 else 3, "units")
+        return "break"
+
+    def load(self, matrix):
+        matrix = np.asarray(matrix)
+        if matrix.ndim == 1 and self.rows == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape != self.values.shape:
+            raise ValueError(f"Expected a {self.rows}x{self.cols} matrix, got {'x'.join(map(str, matrix.shape))}.")
+        if not np.issubdtype(matrix.dtype, np.integer):
+            if not np.issubdtype(matrix.dtype, np.floating) or not np.all(np.mod(matrix, 1) == 0):
+                raise ValueError("Matrix values must be integers.")
+        self.values[:] = matrix
+        self.filled[:] = True
+        self.bad.clear()
+        self.refresh()
+
+    def set_cells(self, cells):
+        # Config-file cells: strings (or numbers), "" for an empty cell.
+        cells = np.array(cells, dtype=str)
+        if cells.shape != self.values.shape:
+            raise ValueError(f"Expected a {self.rows}x{self.cols} matrix, got {'x'.join(map(str, cells.shape))}.")
+        cells = np.char.strip(cells)
+        filled = np.char.str_len(cells) > 0
+        try:
+            values = np.where(filled, cells, "0").astype(np.int64)
+        except ValueError:
+            raise ValueError("Matrix values must be integers.")
+        self.values[:] = values
+        self.filled[:] = filled
+        self.bad.clear()
+        self.refresh()
+
+    def cells(self):
+        cells = np.where(self.filled, self.values.astype(str), "").tolist()
+        for (i, j), text in self.bad.items():
+            cells[i][j] = text
+        return cells
+
+    def get(self, name):
+        if self.bad:
+            i, j = min(self.bad)
+            raise ValueError(f"{name} cell ({i}, {j}) is not a valid integer.")
+        if not self.filled.all():
+            raise ValueError("All fields must be filled.")
+        return self.values.copy()
+
+    def import_file(self):
+        path = filedialog.askopenfilename(filetypes=[("Matrix files", "*.csv *.npy *.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.load(read_matrix_file(path))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Import Error", str(e))
+
+    def paste(self):
+        try:
+            self.load(parse_matrix_text(self.frame.clipboard_get()))
+        except tk.TclError:
+            messagebox.showerror("Paste Error", "Clipboard is empty.")
+        except ValueError as e:
+            messagebox.showerror("Paste Error", str(e))
 
 class GraphVisualizer:
+    LARGE_GRAPH = 200        # nodes; bigger graphs get the column layout and no labels
+    LAYOUT_CACHE_SIZE = 16
+    _layouts = OrderedDict()  # graph structure -> node positions
+    _layouts_lock = threading.Lock()  # figures are built on the worker threads
+
+    # Figures are built with matplotlib.figure.Figure rather than pyplot so
+    # that the rag_figure/charts_figure half can run off the Tk thread.
+    @staticmethod
+    def rag_figure(alloc, req, deadlocked, num_processes, num_resources):
+        fig = mfigure.Figure(figsize=(6, 4))
+        ax = fig.subplots()
+        alloc, req = sparse_rows(alloc), sparse_rows(req)
+        dead = set(deadlocked)
+
+        def draw(subgraph_only):
+            if subgraph_only:
+                # Deadlocked processes plus the resources they hold or wait for.
+                processes = [i for i in range(num_processes) if f'P{i}' in dead]
+                edges = GraphVisualizer._rag_edges(alloc, req, processes)
+                resources = sorted({int(n[1:]) for a, b, _ in edges for n in (a, b) if n[0] == 'R'})
+            else:
+                processes, resources = range(num_processes), range(num_resources)
+                edges = GraphVisualizer._rag_edges(alloc, req, processes)
+            nodes = [f'P{i}' for i in processes] + [f'R{j}' for j in resources]
+            GraphVisualizer._draw_rag(ax, nodes, edges, dead, GraphVisualizer._layout(nodes, edges))
+
+        draw(False)
+        return fig, draw
+
     @staticmethod
-    def show_rag_graph(master, alloc, req, deadlocked, num_processes, num_resources):
+    def show_rag_graph(master, fig, draw):
         window = tb.Toplevel(master)
         window.title("Resource Allocation Graph")
-        fig, ax = plt.subplots(figsize=(6, 4))
-        G = nx.DiGraph()
-
-        for i in range(num_processes):
-            G.add_node(f'P{i}', color='red' if f'P{i}' in deadlocked else 'skyblue')
-        for j in range(num_resources):
-            G.add_node(f'R{j}', color='orange')
-
-        edge_labels = {}
-        for i in range(num_processes):
-            for j in range(num_resources):
-                if alloc[i][j] > 0:
-                    G.add_edge(f'R{j}', f'P{i}')
-                    edge_labels[(f'R{j}', f'P{i}')] = alloc[i][j]
-                if req[i][j] > 0:
-                    G.add_edge(f'P{i}', f'R{j}')
-                    edge_labels[(f'P{i}', f'R{j}')] = req[i][j]
-
-        pos = nx.spring_layout(G, k=0.5, iterations=50)
-        colors = [data['color'] for _, data in G.nodes(data=True)]
-        nx.draw(G, pos, with_labels=True, node_color=colors, node_size=1000, font_size=10, ax=ax)
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-        ax.set_title("RAG (Red: Deadlocked Processes)")
-        
-        canvas = FigureCanvasTkAgg(fig, master=window)
+        subgraph_only = tk.BooleanVar(master=window, value=False)
+
+        def redraw():
+            draw(subgraph_only.get())
+            canvas.draw_idle()
+
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=window)
         canvas.get_tk_widget().pack(fill='both', expand=True)
-        tb.Button(window, text="Save Graph", command=lambda: fig.savefig("rag_graph.png"), bootstyle="success").pack(pady=5)
+        controls = tb.Frame(window)
+        controls.pack(pady=5)
+        tb.Checkbutton(controls, text="Deadlocked subgraph only", variable=subgraph_only, command=redraw, bootstyle="round-toggle").pack(side="left", padx=5)
+        tb.Button(controls, text="Save Graph", command=lambda: fig.savefig("rag_graph.png"), bootstyle="success").pack(side="left", padx=5)
         canvas.draw()
 
     @staticmethod
-    def show_charts(master, alloc, num_resources):
-        alloc_sum = np.sum(alloc, axis=0)
+    def _rag_edges(alloc, req, processes):
+        edges = []
+        for i in processes:
+            for j, v in alloc[i].items():
+                if v > 0:
+                    edges.append((f'R{j}', f'P{i}', v))
+            for j, v in req[i].items():
+                if v > 0:
+                    edges.append((f'P{i}', f'R{j}', v))
+        return edges
+
+    @classmethod
+    def _layout(cls, nodes, edges):
+        # Layouts only depend on the graph structure, so redraws of the same
+        # snapshot (or one differing only in unit counts) reuse them.
+        key = (tuple(nodes), tuple((a, b) for a, b, _ in edges))
+        with cls._layouts_lock:
+            pos = cls._layouts.get(key)
+            if pos is not None:
+                cls._layouts.move_to_end(key)
+                return pos
+
+        if len(nodes) > cls.LARGE_GRAPH:
+            # Processes in one column, resources in another: O(n) and stable.
+            columns = {'P': [n for n in nodes if n[0] == 'P'], 'R': [n for n in nodes if n[0] == 'R']}
+            pos = {}
+            for x, kind in enumerate("PR"):
+                column = columns[kind]
+                for k, n in enumerate(column):
+                    pos[n] = (float(x), 1.0 - k / max(len(column) - 1, 1))
+        else:
+            G = nx.DiGraph()
+            G.add_nodes_from(nodes)
+            G.add_edges_from(key[1])
+            pos = {n: tuple(xy) for n, xy in nx.spring_layout(G, k=0.5, iterations=50, seed=0).items()}
+
+        # Computed outside the lock; two runs racing on one graph both store
+        # the same deterministic layout.
+        with cls._layouts_lock:
+            cls._layouts[key] = pos
+            cls._layouts.move_to_end(key)
+            while len(cls._layouts) > cls.LAYOUT_CACHE_SIZE:
+                cls._layouts.popitem(last=False)
+        return pos
+
+    @staticmethod
+    def _draw_rag(ax, nodes, edges, dead, pos):
+        ax.clear()
+        large = len(nodes) > GraphVisualizer.LARGE_GRAPH
+        # One collection for all edges: green = held (R -> P), grey = requested (P -> R).
+        segments = [(pos[a], pos[b]) for a, b, _ in edges]
+        colors = ['seagreen' if a[0] == 'R' else 'gray' for a, _, _ in edges]
+        ax.add_collection(mcollections.LineCollection(segments, colors=colors, linewidths=0.5 if large else 1.5, zorder=1))
+        node_colors = ['red' if n in dead else 'skyblue' if n[0] == 'P' else 'orange' for n in nodes]
+        ax.scatter([pos[n][0] for n in nodes], [pos[n][1] for n in nodes], c=node_colors, s=10 if large else 600, zorder=2)
+        if not large:
+            for n in nodes:
+                ax.text(pos[n][0], pos[n][1], n, ha='center', va='center', fontsize=10, zorder=3)
+            for a, b, v in edges:
+                ax.text((pos[a][0] + pos[b][0]) / 2, (pos[a][1] + pos[b][1]) / 2, str(v), fontsize=8, ha='center', va='center',
+                        bbox=dict(boxstyle='round,pad=0.1', fc='white', ec='none'), zorder=3)
+        ax.autoscale_view()
+        ax.margins(0.1)
+        ax.set_axis_off()
+        ax.set_title("RAG (Red: Deadlocked, Green: Held, Grey: Requested)")
+
+    @staticmethod
+    def charts_figure(alloc, num_resources):
+        alloc_sum = np.array(column_totals(alloc, num_resources))
         if np.sum(alloc_sum) == 0:
-            messagebox.showinfo("Info", "No resources allocated to display charts.")
-            return
+            return None
 
-        fig, axs = plt.subplots(1, 2, figsize=(9, 4))
+        fig = mfigure.Figure(figsize=(9, 4))
+        axs = fig.subplots(1, 2)
         labels = [f'R{i}' for i in range(num_resources)]
         non_zero = [alloc_sum[i] for i in range(num_resources) if alloc_sum[i] > 0]
         non_zero_labels = [labels[i] for i in range(num_resources) if alloc_sum[i] > 0]
@@ -158,15 +357,23 @@ class GraphVisualizer:
         axs[1].set_ylabel("Units")
         if not non_zero:
             axs[1].text(0.5, 0.5, "No Resources Allocated", ha='center', va='center', fontsize=12, color='red', transform=axs[1].transAxes)
-        plt.tight_layout()
+        fig.tight_layout()
+        return fig
 
+    @staticmethod
+    def show_charts(master, fig):
+        if fig is None:
+            messagebox.showinfo("Info", "No resources allocated to display charts.")
+            return
         chart_window = tb.Toplevel(master)
         chart_window.title("Resource Utilization Charts")
-        canvas = FigureCanvasTkAgg(fig, master=chart_window)
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=chart_window)
         canvas.get_tk_widget().pack(fill='both', expand=True)
         canvas.draw()
 
 class DeadlockGUI:
+    STAGES = ("Analysing", "Planning recovery", "Building graph", "Building charts")
+
     def __init__(self, master):
         self.master = master
         self.master.title("Smart Deadlock Detection & Prevention System")
@@ -179,9 +386,17 @@ class DeadlockGUI:
         self.instance_mode = tk.StringVar(value="Multi-Instance")  # New: Single or Multi-Instance
         self.style = tb.Style(theme=self.theme_var.get())
         self.manager = None
-        self.alloc_entries = []
-        self.req_entries = []
-        self.available_entries = []
+        self.alloc_grid = None
+        self.req_grid = None
+        self.avail_grid = None
+        self.store = SnapshotStore()
+        # Analysis runs on a worker thread; run_id lets a newer submission
+        # (or Cancel) supersede a run that is still in flight.
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.manager_lock = threading.Lock()
+        self.run_id = 0
+        self.cancel_event = None
+        self.progress_label = None  # built with the matrix screen
         print("Initializing GUI...")
         self.create_main_widgets()
 
@@ -238,17 +453,18 @@ class DeadlockGUI:
         input_frame.columnconfigure(2, weight=1)
 
         # Process input
-        tb.Label(input_frame, text="Processes (1-10):", font=("Helvetica", 13)).grid(row=0, column=0, sticky="e", padx=5)
+        tb.Label(input_frame, text="Processes:", font=("Helvetica", 13)).grid(row=0, column=0, sticky="e", padx=5)
         tb.Entry(input_frame, textvariable=self.num_processes, width=10).grid(row=0, column=1, sticky="w", padx=5)
 
         # Resource input
-        tb.Label(input_frame, text="Resources (1-10):", font=("Helvetica", 13)).grid(row=1, column=0, sticky="e", padx=5)
+        tb.Label(input_frame, text="Resources:", font=("Helvetica", 13)).grid(row=1, column=0, sticky="e", padx=5)
         tb.Entry(input_frame, textvariable=self.num_resources, width=10).grid(row=1, column=1, sticky="w", padx=5)
 
         # Next button
         tb.Button(input_frame, text="Next", command=self.create_matrix_inputs, bootstyle="primary").grid(row=2, column=0, columnspan=2, pady=10)
 
     def change_theme(self, theme):
+        self.cancel_run()  # the rebuild destroys the widgets poll_run updates
         self.style.theme_use(theme)
         self.create_main_widgets()
 
@@ -257,18 +473,15 @@ class DeadlockGUI:
         try:
             p = self.num_processes.get()
             r = self.num_resources.get()
-            if p <= 0 or r <= 0 or p > 10 or r > 10:
-                raise ValueError("Processes and resources must be between 1 and 10.")
+            if p <= 0 or r <= 0:
+                raise ValueError("Processes and resources must be positive.")
         except:
-            messagebox.showerror("Invalid Input", "Enter valid integers between 1 and 10.")
+            messagebox.showerror("Invalid Input", "Enter positive integers for processes and resources.")
             return
 
         self.manager = DeadlockManager(p, r, instance_mode=self.instance_mode.get())
         self.p = p
         self.r = r
-        self.alloc_entries = []
-        self.req_entries = []
-        self.available_entries = []
 
         # Destroy existing widgets except the top frames (image, theme, mode)
         for widget in self.master.winfo_children()[3:]:
@@ -295,92 +508,145 @@ class DeadlockGUI:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
-        tb.Label(scrollable_frame, text="Allocation Matrix", font=("Helvetica", 14)).grid(row=0, column=0, columnspan=self.r, pady=5)
-        tb.Label(scrollable_frame, text="(Resources currently held by each process)", font=("Helvetica", 10)).grid(row=1, column=0, columnspan=self.r)
-        for i in range(self.p):
-            row = []
-            for j in range(self.r):
-                entry = tb.Entry(scrollable_frame, width=5)
-                entry.grid(row=i + 2, column=j, padx=2, pady=2)
-                row.append(entry)
-            self.alloc_entries.append(row)
+        tb.Label(scrollable_frame, text="Allocation Matrix", font=("Helvetica", 14)).grid(row=0, column=0, pady=5)
+        tb.Label(scrollable_frame, text="(Resources currently held by each process)", font=("Helvetica", 10)).grid(row=1, column=0)
+        self.alloc_grid = MatrixGrid(scrollable_frame, self.p, self.r)
+        self.alloc_grid.frame.grid(row=2, column=0, pady=2)
 
-        offset = self.p + 3
-        tb.Label(scrollable_frame, text="Request Matrix", font=("Helvetica", 14)).grid(row=offset, column=0, columnspan=self.r, pady=5)
-        tb.Label(scrollable_frame, text="(Additional resources needed by each process)", font=("Helvetica", 10)).grid(row=offset + 1, column=0, columnspan=self.r)
-        for i in range(self.p):
-            row = []
-            for j in range(self.r):
-                entry = tb.Entry(scrollable_frame, width=5)
-                entry.grid(row=offset + i + 2, column=j, padx=2, pady=2)
-                row.append(entry)
-            self.req_entries.append(row)
+        tb.Label(scrollable_frame, text="Request Matrix", font=("Helvetica", 14)).grid(row=3, column=0, pady=5)
+        tb.Label(scrollable_frame, text="(Additional resources needed by each process)", font=("Helvetica", 10)).grid(row=4, column=0)
+        self.req_grid = MatrixGrid(scrollable_frame, self.p, self.r)
+        self.req_grid.frame.grid(row=5, column=0, pady=2)
 
-        tb.Label(scrollable_frame, text="Available Resources:", font=("Helvetica", 13)).grid(row=offset + self.p + 3, column=0, columnspan=2, pady=5)
-        tb.Label(scrollable_frame, text="(Free resources in the system)", font=("Helvetica", 10)).grid(row=offset + self.p + 4, column=0, columnspan=2)
-        self.available_entries = [tb.Entry(scrollable_frame, width=5) for _ in range(self.r)]
-        for j, entry in enumerate(self.available_entries):
-            entry.grid(row=offset + self.p + 5, column=j, padx=2, pady=2)
+        tb.Label(scrollable_frame, text="Available Resources:", font=("Helvetica", 13)).grid(row=6, column=0, pady=5)
+        tb.Label(scrollable_frame, text="(Free resources in the system)", font=("Helvetica", 10)).grid(row=7, column=0)
+        self.avail_grid = MatrixGrid(scrollable_frame, 1, self.r, row_prefix=None)
+        self.avail_grid.frame.grid(row=8, column=0, pady=2)
 
         button_frame = tb.Frame(main_frame)
         button_frame.pack(pady=10)
         button_label = "Detect Deadlock" if self.mode.get() == "Detection" else "Prevent Deadlock"
         tb.Button(button_frame, text=button_label, command=self.process_deadlock, bootstyle="danger").pack(side="left", padx=5)
-        tb.Button(button_frame, text="Save Config", command=self.save_config, bootstyle="info").pack(side="left", padx=5)
-        tb.Button(button_frame, text="Load Config", command=self.load_config, bootstyle="info").pack(side="left", padx=5)
+        tb.Button(button_frame, text="Save Snapshot", command=self.save_snapshot, bootstyle="info").pack(side="left", padx=5)
+        tb.Button(button_frame, text="Load Snapshot", command=self.load_snapshot, bootstyle="info").pack(side="left", padx=5)
+        tb.Button(button_frame, text="Export JSON", command=self.save_config, bootstyle="info-outline").pack(side="left", padx=5)
+        tb.Button(button_frame, text="Import JSON", command=self.load_config, bootstyle="info-outline").pack(side="left", padx=5)
         tb.Button(button_frame, text="Back", command=self.confirm_back, bootstyle="secondary").pack(side="left", padx=5)
 
+        progress_frame = tb.Frame(main_frame)
+        progress_frame.pack(pady=5)
+        self.progress = tb.Progressbar(progress_frame, maximum=len(self.STAGES), length=200, bootstyle="info-striped")
+        self.progress.pack(side="left", padx=5)
+        self.progress_label = tb.Label(progress_frame, text="", font=("Helvetica", 10))
+        self.progress_label.pack(side="left", padx=5)
+        self.cancel_button = tb.Button(progress_frame, text="Cancel", command=self.cancel_run, bootstyle="warning", state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
     def confirm_back(self):
         if messagebox.askyesno("Confirm", "Are you sure you want to go back? Unsaved data will be lost."):
+            self.cancel_run()
             self.create_main_widgets()
 
+    def resize_inputs(self, p, r):
+        # Rebuild the matrix grids when loaded data has a different size.
+        if (p, r) != (self.p, self.r):
+            self.num_processes.set(p)
+            self.num_resources.set(r)
+            self.create_matrix_inputs()
+
+    def save_snapshot(self):
+        try:
+            alloc = self.alloc_grid.get("Allocation")
+            req = self.req_grid.get("Request")
+            avail = self.avail_grid.get("Available")[0]
+        except ValueError as ve:
+            messagebox.showerror("Error", str(ve))
+            return
+        name = simpledialog.askstring("Save Snapshot", "Snapshot name:", initialvalue=time.strftime("snapshot %Y-%m-%d %H:%M:%S"), parent=self.master)
+        if not name:
+            return
+        if name in self.store and not messagebox.askyesno("Confirm", f"Overwrite snapshot '{name}'?"):
+            return
+        try:
+            self.store.save(name, alloc, req, avail, self.instance_mode.get())
+            messagebox.showinfo("Success", f"Snapshot '{name}' saved!")
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to save snapshot: {str(e)}")
+
+    def load_snapshot(self):
+        entries = self.store.list()
+        if not entries:
+            messagebox.showinfo("Info", "No saved snapshots yet.")
+            return
+        window = tb.Toplevel(self.master)
+        window.title("Snapshots")
+        listbox = tk.Listbox(window, width=60, height=min(len(entries), 15))
+        for e in entries:
+            saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(e["saved"]))
+            listbox.insert(tk.END, f"{e['name']}  ({e['processes']}x{e['resources']}, {saved})")
+        listbox.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def selected():
+            picked = listbox.curselection()
+            return entries[picked[0]] if picked else None
+
+        def load():
+            entry = selected()
+            if entry is None:
+                return
+            try:
+                alloc, req, avail = self.store.load(entry["name"])
+                if entry.get("instance_mode"):
+                    self.instance_mode.set(entry["instance_mode"])
+                self.num_processes.set(entry["processes"])
+                self.num_resources.set(entry["resources"])
+                self.create_matrix_inputs()
+                self.alloc_grid.load(alloc)
+                self.req_grid.load(req)
+                self.avail_grid.load(avail)
+            except (OSError, KeyError, ValueError) as e:
+                messagebox.showerror("Error", f"Failed to load snapshot: {str(e)}")
+                return
+            window.destroy()
+
+        def delete():
+            entry = selected()
+            if entry is not None and messagebox.askyesno("Confirm", f"Delete snapshot '{entry['name']}'?"):
+                self.store.delete(entry["name"])
+                index = entries.index(entry)
+                entries.pop(index)
+                listbox.delete(index)
+
+        buttons = tb.Frame(window)
+        buttons.pack(pady=5)
+        tb.Button(buttons, text="Load", command=load, bootstyle="primary").pack(side="left", padx=5)
+        tb.Button(buttons, text="Delete", command=delete, bootstyle="danger").pack(side="left", padx=5)
+        listbox.bind("<Double-Button-1>", lambda e: load())
+
     def save_config(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="config.json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
         try:
-            config = {
-                "processes": self.p,
-                "resources": self.r,
-                "alloc": [[e.get() for e in row] for row in self.alloc_entries],
-                "req": [[e.get() for e in row] for row in self.req_entries],
-                "avail": [e.get() for e in self.available_entries]
-            }
-            with open("config.json", "w") as f:
-                json.dump(config, f)
+            write_config(path, self.alloc_grid.cells(), self.req_grid.cells(), self.avail_grid.cells()[0])
             messagebox.showinfo("Success", "Configuration saved!")
         except:
             messagebox.showerror("Error", "Failed to save configuration.")
 
     def load_config(self):
+        path = filedialog.askopenfilename(initialfile="config.json", filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
         try:
-            with open("config.json", "r") as f:
-                config = json.load(f)
-            
-            if not all(key in config for key in ["processes", "resources", "alloc", "req", "avail"]):
-                raise ValueError("Invalid configuration file: missing required keys.")
-            if config["processes"] != self.p or config["resources"] != self.r:
-                raise ValueError(f"Configuration mismatch: expected {self.p} processes and {self.r} resources, got {config['processes']} processes and {config['resources']} resources.")
-            if len(config["alloc"]) != self.p or any(len(row) != self.r for row in config["alloc"]):
-                raise ValueError("Allocation matrix size mismatch.")
-            if len(config["req"]) != self.p or any(len(row) != self.r for row in config["req"]):
-                raise ValueError("Request matrix size mismatch.")
-            if len(config["avail"]) != self.r:
-                raise ValueError("Available resources size mismatch.")
+            config = read_config(path)
 
             self.master.config(cursor="wait")
             self.master.update()
 
-            for i, row in enumerate(self.alloc_entries):
-                for j, e in enumerate(row):
-                    e.delete(0, tk.END)
-                    e.insert(0, config["alloc"][i][j])
-
-            for i, row in enumerate(self.req_entries):
-                for j, e in enumerate(row):
-                    e.delete(0, tk.END)
-                    e.insert(0, config["req"][i][j])
-
-            for j, e in enumerate(self.available_entries):
-                e.delete(0, tk.END)
-                e.insert(0, config["avail"][j])
+            self.resize_inputs(config["processes"], config["resources"])
+            self.alloc_grid.set_cells(config["alloc"])
+            self.req_grid.set_cells(config["req"])
+            self.avail_grid.set_cells([config["avail"]])
 
             self.master.config(cursor="")
             messagebox.showinfo("Success", "Configuration loaded!")
@@ -398,71 +664,110 @@ class DeadlockGUI:
             messagebox.showerror("Error", f"Failed to load configuration: {str(e)}")
 
     def process_deadlock(self):
+        # Whole-array validation: no per-cell widget reads.
         try:
-            alloc = []
-            for row in self.alloc_entries:
-                row_vals = []
-                for e in row:
-                    if e.get().strip() == "":
-                        raise ValueError("All fields must be filled.")
-                    row_vals.append(int(e.get()))
-                alloc.append(row_vals)
-            
-            req = []
-            for row in self.req_entries:
-                row_vals = []
-                for e in row:
-                    if e.get().strip() == "":
-                        raise ValueError("All fields must be filled.")
-                    row_vals.append(int(e.get()))
-                req.append(row_vals)
-            
-            avail = []
-            for e in self.available_entries:
-                if e.get().strip() == "":
-                    raise ValueError("All fields must be filled.")
-                avail.append(int(e.get()))
-
-            if any(x < 0 for row in alloc for x in row) or \
-               any(x < 0 for row in req for x in row) or \
-               any(x < 0 for x in avail):
+            alloc = self.alloc_grid.get("Allocation")
+            req = self.req_grid.get("Request")
+            avail = self.avail_grid.get("Available")[0]
+            if (alloc < 0).any() or (req < 0).any() or (avail < 0).any():
                 raise ValueError("Matrix values cannot be negative.")
 
-            total_alloc = [sum(alloc[i][j] for i in range(self.p)) for j in range(self.r)]
-            for j in range(self.r):
-                if total_alloc[j] > avail[j] + total_alloc[j]:
-                    raise ValueError(f"Total allocated R{j} exceeds system capacity.")
-            for i in range(self.p):
-                for j in range(self.r):
-                    if req[i][j] > avail[j] + total_alloc[j]:
-                        raise ValueError(f"Request for R{j} by P{i} exceeds available resources.")
+            over = np.argwhere(req > avail + alloc.sum(axis=0))
+            if len(over):
+                i, j = over[0]
+                raise ValueError(f"Request for R{j} by P{i} exceeds available resources.")
         except ValueError as ve:
             messagebox.showerror("Error", str(ve))
             return
-        except:
-            messagebox.showerror("Error", "Fill all fields with valid integers.")
+
+        self.start_run(alloc.tolist(), req.tolist(), avail.tolist())
+
+    ######## Background analysis: worker thread + after() polling ##########
+    def start_run(self, alloc, req, avail):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.run_id += 1
+        self.cancel_event = threading.Event()
+        state = {"stage": 0}
+        future = self.executor.submit(self.analyse, self.manager, alloc, req, avail, self.mode.get(), state, self.cancel_event)
+        self.progress.configure(value=0)
+        self.progress_label.configure(text=self.STAGES[0] + "...")
+        self.cancel_button.configure(state="normal")
+        self.master.after(50, self.poll_run, self.run_id, future, state)
+
+    def cancel_run(self):
+        # The worker notices at its next stage boundary; its result is dropped either way.
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_event = None
+        self.run_id += 1
+        self.finish_progress("Cancelled")
+
+    def finish_progress(self, text):
+        if self.progress_label is not None and self.progress_label.winfo_exists():
+            self.progress.configure(value=0)
+            self.progress_label.configure(text=text)
+            self.cancel_button.configure(state="disabled")
+
+    def analyse(self, manager, alloc, req, avail, mode, state, cancelled):
+        # Runs on the worker thread: no Tk calls or Tk variables in here.
+        result = {"mode": mode}
+        with self.manager_lock:
+            if mode == "Detection":
+                result["is_safe"], result["safe_seq"], result["deadlocked"] = manager.detect_deadlock(alloc, req, avail)
+                state["stage"] = 1
+                if not result["is_safe"] and not cancelled.is_set():
+                    result["victims"], result["freed"], _ = manager.plan_recovery(alloc, req, avail)
+            else:
+                result["is_safe"], result["safe_seq"], result["deadlocked"] = manager.prevent_deadlock(alloc, req, avail)
+        if cancelled.is_set():
+            return None
+        state["stage"] = 2
+        result["rag"] = GraphVisualizer.rag_figure(alloc, req, result["deadlocked"], manager.p, manager.r)
+        if cancelled.is_set():
+            return None
+        state["stage"] = 3
+        result["charts"] = GraphVisualizer.charts_figure(alloc, manager.r)
+        return result
+
+    def poll_run(self, run_id, future, state):
+        if run_id != self.run_id:
+            return  # superseded or cancelled
+        if not future.done():
+            self.progress.configure(value=state["stage"])
+            self.progress_label.configure(text=self.STAGES[state["stage"]] + "...")
+            self.master.after(50, self.poll_run, run_id, future, state)
+            return
+        self.cancel_event = None
+        self.finish_progress("")
+        try:
+            result = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Analysis failed: {str(e)}")
             return
+        if result is not None:
+            self.show_result(result)
 
-        if self.mode.get() == "Detection":
-            is_safe, safe_seq, deadlocked = self.manager.detect_deadlock(alloc, req, avail)
-            if is_safe:
+    def show_result(self, result):
+        safe_seq, deadlocked = result["safe_seq"], result["deadlocked"]
+        if result["mode"] == "Detection":
+            if result["is_safe"]:
                 messagebox.showinfo("✅ Safe State", f"System is in Safe State.\nSafe Sequence: {' ➝ '.join(safe_seq)}")
             else:
-                self.master.bell()
-                winsound.Beep(1000, 500)  # Beep sound
+                beep(self.master)
                 messagebox.showerror("❌ Deadlock Detected", f"Deadlock in: {', '.join(deadlocked) or 'None'} (Instance Mode: {self.instance_mode.get()})")
-                recovery_proc = self.manager.recover_deadlock(alloc, req, avail)
-                if recovery_proc:
-                    messagebox.showinfo("Recovery Suggestion", f"Consider terminating {recovery_proc} to break deadlock.")
+                victims, freed = result["victims"], result["freed"]
+                if victims:
+                    freed_text = ', '.join(f'R{j}: {v}' for j, v in enumerate(freed) if v) or 'nothing'
+                    messagebox.showinfo("Recovery Suggestion", f"Consider terminating {', '.join(victims)} to break deadlock.\nFreed resources: {freed_text}")
         else:
-            is_safe, safe_seq, deadlocked = self.manager.prevent_deadlock(alloc, req, avail)
-            if is_safe:
+            if result["is_safe"]:
                 messagebox.showinfo("✅ No Deadlock", f"Deadlock Prevented.\nSafe Order: {' ➝ '.join(safe_seq)}")
             else:
                 messagebox.showwarning("⚠️ Partial Prevention", f"Could not prevent deadlock for: {', '.join(deadlocked) or 'None'}")
 
-        GraphVisualizer.show_rag_graph(self.master, alloc, req, deadlocked, self.p, self.r)
-        GraphVisualizer.show_charts(self.master, alloc, self.r)
+        GraphVisualizer.show_rag_graph(self.master, *result["rag"])
+        GraphVisualizer.show_charts(self.master, result["charts"])
 
 if __name__ == "__main__":
     root = tb.Window(themename="superhero")
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+class SnapshotStore:
+    # Named snapshots in one directory. Each snapshot is a single .npy file
+    # with alloc, req and avail stacked into a (2P+1) x R int64 array;
+    # index.json maps names to files and sizes, so listing never touches the
+    # arrays and loading memory-maps them instead of parsing text.
+    INDEX = "index.json"
+
+    def __init__(self, root="snapshots"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._index = None
+        self._index_mtime = None
+
+    def _read_index(self):
+        path = os.path.join(self.root, self.INDEX)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._index, self._index_mtime = {}, None
+            return self._index
+        if self._index is None or mtime != self._index_mtime:
+            with open(path, "r") as f:
+                self._index = json.load(f)["snapshots"]
+            self._index_mtime = mtime
+        return self._index
+
+    def _write_index(self, index):
+        path = os.path.join(self.root, self.INDEX)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "snapshots": index}, f, indent=1)
+        os.replace(tmp, path)
+        self._index, self._index_mtime = index, os.stat(path).st_mtime_ns
+
+    def list(self):
+        # Newest first.
+        index = self._read_index()
+        return sorted(({"name": name, **entry} for name, entry in index.items()), key=lambda e: e["saved"], reverse=True)
+
+    def __contains__(self, name):
+        return name in self._read_index()
+
+    def save(self, name, alloc, req, avail, instance_mode=None):
+        if not name or not name.strip():
+            raise ValueError("Snapshot name cannot be empty.")
+        alloc = np.asarray(alloc, dtype=np.int64)
+        req = np.asarray(req, dtype=np.int64)
+        avail = np.asarray(avail, dtype=np.int64).reshape(1, -1)
+        p, r = len(alloc), avail.shape[1]
+        if alloc.shape != (p, r) or req.shape != (p, r):
+            raise ValueError("Snapshot size mismatch.")
+
+        filename = hashlib.blake2b(name.encode(), digest_size=8).hexdigest() + ".npy"
+        path = os.path.join(self.root, filename)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.vstack([alloc, req, avail]))
+        os.replace(tmp, path)
+
+        index = dict(self._read_index())
+        index[name] = {"file": filename, "processes": p, "resources": r,
+                       "instance_mode": instance_mode, "saved": time.time()}
+        self._write_index(index)
+
+    def load(self, name, mmap=True):
+        # Returns read-only views into the mapped file; copy before editing.
+        entry = self._read_index().get(name)
+        if entry is None:
+            raise KeyError(f"No snapshot named '{name}'.")
+        data = np.load(os.path.join(self.root, entry["file"]), mmap_mode="r" if mmap else None)
+        p = entry["processes"]
+        return data[:p], data[p:2 * p], data[2 * p]
+
+    def info(self, name):
+        entry = self._read_index().get(name)
+        if entry is None:
+            raise KeyError(f"No snapshot named '{name}'.")
+        return dict(entry, name=name)
+
+    def delete(self, name):
+        index = dict(self._read_index())
+        entry = index.pop(name, None)
+        if entry is None:
+            raise KeyError(f"No snapshot named '{name}'.")
+        self._write_index(index)
+        try:
+            os.remove(os.path.join(self.root, entry["file"]))
+        except FileNotFoundError:
+            pass
+
+    def import_config(self, name, path):
+        config = read_config(path)
+        self.save(name, *(parse_cells(config[key]) for key in ("alloc", "req", "avail")), config.get("instance_mode"))
+
+    def export_config(self, name, path):
+        alloc, req, avail = self.load(name)
+        write_config(path, alloc.tolist(), req.tolist(), avail.tolist())
+
+######## config.json format: stringified cells, "" for an empty cell ##########
+def read_config(path):
+    with open(path, "r") as f:
+        config = json.load(f)
+    if not all(key in config for key in ["processes", "resources", "alloc", "req", "avail"]):
+        raise ValueError("Invalid configuration file: missing required keys.")
+    p, r = config["processes"], config["resources"]
+    if len(config["alloc"]) != p or any(len(row) != r for row in config["alloc"]):
+        raise ValueError("Allocation matrix size mismatch.")
+    if len(config["req"]) != p or any(len(row) != r for row in config["req"]):
+        raise ValueError("Request matrix size mismatch.")
+    if len(config["avail"]) != r:
+        raise ValueError("Available resources size mismatch.")
+    return config
+
+def write_config(path, alloc, req, avail):
+    config = {
+        "processes": len(alloc),
+        "resources": len(avail),
+        "alloc": [[str(v) for v in row] for row in alloc],
+        "req": [[str(v) for v in row] for row in req],
+        "avail": [str(v) for v in avail]
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(config, f)
+    os.replace(tmp, path)
+
+def parse_cells(cells):
+    cells = np.char.strip(np.array(cells, dtype=str))
+    if (np.char.str_len(cells) == 0).any():
+        raise ValueError("All fields must be filled.")
+    try:
+        return cells.astype(np.int64)
+    except ValueError:
+        raise ValueError("Matrix values must be integers.")
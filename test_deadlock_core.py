@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from deadlock_core import BankersManager, DeadlockManager, DeadlockTracker, MemorySink
+
+def _random_event(rng, tracker, capacity):
+    p, r = tracker.p, tracker.r
+    i = rng.randrange(p)
+    kind = rng.random()
+    if kind < 0.35:
+        # Requests stay within capacity; detect_deadlock reports every
+        # process for an impossible request, the tracker only the requester.
+        tracker.request(i, [rng.randint(0, max(0, min(2, capacity[j] - tracker.req[i][j]))) for j in range(r)])
+    elif kind < 0.7:
+        tracker.allocate(i, [rng.randint(0, min(2, tracker.avail[j])) for j in range(r)])
+    elif kind < 0.95:
+        tracker.release(i, [rng.randint(0, tracker.alloc[i][j]) for j in range(r)])
+    else:
+        tracker.cancel_request(i)
+
+def _check_against_recompute(tracker):
+    is_safe, safe_seq, deadlocked = tracker.status()
+    expected = DeadlockManager(tracker.p, tracker.r).detect_deadlock(tracker.alloc, tracker.req, tracker.avail)
+    assert is_safe == expected[0]
+    assert sorted(deadlocked) == sorted(expected[2])
+    # The tracker's order must itself be a valid safe sequence.
+    work = tracker.avail[:]
+    for label in safe_seq:
+        i = int(label[1:])
+        assert all(tracker.req[i][j] <= work[j] for j in range(tracker.r))
+        work = [w + a for w, a in zip(work, tracker.alloc[i])]
+    assert work == tracker.work
+    assert tracker.total_alloc == [sum(row[j] for row in tracker.alloc) for j in range(tracker.r)]
+
+def test_tracker_matches_full_recompute_small():
+    rng = random.Random(3)
+    for _ in range(300):
+        p, r = rng.randint(1, 7), rng.randint(1, 4)
+        capacity = [rng.randint(0, 5) for _ in range(r)]
+        tracker = DeadlockTracker(p, r, capacity)
+        for _ in range(40):
+            _random_event(rng, tracker, capacity)
+            _check_against_recompute(tracker)
+
+def test_tracker_matches_full_recompute_after_load():
+    rng = random.Random(11)
+    p, r = 200, 30
+    alloc = [[rng.randint(0, 1) for _ in range(r)] for _ in range(p)]
+    req = [[rng.randint(0, 1) for _ in range(r)] for _ in range(p)]
+    avail = [rng.randint(0, 3) for _ in range(r)]
+    capacity = [a + sum(row[j] for row in alloc) for j, a in enumerate(avail)]
+    tracker = DeadlockTracker(p, r, avail)
+    tracker.load(alloc, req, avail)
+    _check_against_recompute(tracker)
+    for _ in range(300):
+        _random_event(rng, tracker, capacity)
+        _check_against_recompute(tracker)
+
+def test_tracker_rejects_single_instance():
+    with pytest.raises(ValueError):
+        DeadlockTracker(2, 2, [1, 1], instance_mode="Single-Instance")
+
+def test_evaluate_requests_first_matches_full_scan():
+    rng = random.Random(5)
+    for _ in range(500):
+        p, r = rng.randint(1, 8), rng.randint(1, 4)
+        claim = [[rng.randint(0, 4) for _ in range(r)] for _ in range(p)]
+        alloc = [[rng.randint(0, c) for c in row] for row in claim]
+        avail = [rng.randint(0, 3) for _ in range(r)]
+        banker = BankersManager(p, r, claim, alloc, [a + sum(row[j] for row in alloc) for j, a in enumerate(avail)])
+        requests = []
+        for _ in range(rng.randint(1, 6)):
+            i = rng.randrange(p)
+            requests.append((i, [rng.randint(0, n) for n in banker.need[i]]))
+        full = banker.evaluate_requests(requests)
+        expected = [False] * len(full)
+        if True in full:
+            expected[full.index(True)] = True
+        assert banker.evaluate_requests(requests, first=True) == expected
+
+def test_callable_policy_and_cost_are_instrumented():
+    alloc, req, avail = [[1, 0], [0, 1]], [[0, 1], [1, 0]], [0, 0]
+    sink = MemorySink()
+    manager = DeadlockManager(2, 2, cache_size=8, sink=sink)
+    for _ in range(2):
+        manager.schedule(alloc, req, avail, policy=lambda i: -i)
+        manager.plan_recovery(alloc, req, avail, cost=lambda i: i)
+    assert [r["op"] for r in sink.records] == ["prevent", "recover"] * 2
+    assert not any(r["cache_hit"] for r in sink.records)
+    assert manager.cache_info()["size"] == 0
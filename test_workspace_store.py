@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from user_store import UserStore
+from workspace_store import WorkspaceStore
+
+def _blobs(store):
+    return [name for _, _, names in os.walk(store.blob_dir) for name in names]
+
+def _check(store, user):
+    # Incremental totals must agree with a walk of the tree, and every file
+    # must still be readable.
+    usage = store.usage(user)
+    assert store.recount(user) == usage
+    for dirpath, _, names in os.walk(store.user_root(user)):
+        for name in names:
+            assert ".link" not in name
+            with open(os.path.join(dirpath, name), "rb") as f:
+                f.read()
+    return usage
+
+def test_recreate_with_identical_content(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    store.create("u", "a.txt", "hello")
+    store.create("u", "a.txt", "hello")
+    assert _check(store, "u")["bytes"] == 5
+    assert sorted(os.listdir(store.user_root("u"))) == ["a.txt"]
+    assert len(_blobs(store)) == 1
+
+def test_copy_onto_itself_and_onto_a_twin(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    store.create("u", "a.txt", "hello")
+    store.copy("u", "a.txt", "a.txt")
+    store.copy("u", "a.txt", "b.txt")
+    store.copy("u", "a.txt", "b.txt")
+    assert _check(store, "u") == {"bytes": 10, "files": 2, "quota": store.quota}
+    assert len(_blobs(store)) == 1
+
+def test_move_onto_itself_and_onto_a_twin(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    store.create("u", "b.txt", "hello")
+    store.move("u", "b.txt", "b.txt")
+    assert _check(store, "u")["files"] == 1
+    store.copy("u", "b.txt", "c.txt")
+    store.move("u", "b.txt", "c.txt")
+    assert _check(store, "u") == {"bytes": 5, "files": 1, "quota": store.quota}
+    assert sorted(os.listdir(store.user_root("u"))) == ["c.txt"]
+    assert len(_blobs(store)) == 1
+
+def test_last_delete_removes_the_blob(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    store.create("u", "a.txt", "hello")
+    store.create("v", "b.txt", "hello")
+    store.delete("u", "a.txt")
+    assert len(_blobs(store)) == 1
+    store.delete("v", "b.txt")
+    assert _blobs(store) == []
+    assert _check(store, "u")["bytes"] == _check(store, "v")["bytes"] == 0
+
+def test_unsafe_user_names_are_rejected(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    users = UserStore(str(tmp_path / "users.txt"), iterations=1)
+    for name in ("", ".", "..", "a/b", "a\\b", "a,b"):
+        with pytest.raises(ValueError):
+            users.register(name, "pw")
+        with pytest.raises(ValueError):
+            store.usage(name)
+    assert os.listdir(store.user_dir) == []
@@ -0,0 +1,153 @@
+import hashlib
+import hmac
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+HASH_SCHEME = "pbkdf2_sha256"
+DEFAULT_ITERATIONS = int(os.environ.get("USER_HASH_ITERATIONS", 200000))
+
+def hash_password(password, iterations=DEFAULT_ITERATIONS, salt=None):
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored):
+    # Lines written before hashing hold the plain password.
+    if not stored.startswith(HASH_SCHEME + "$"):
+        return hmac.compare_digest(stored.encode(), password.encode())
+    _, iterations, salt, digest = stored.split("$")
+    candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(candidate.hex(), digest)
+
+def needs_rehash(stored, iterations):
+    if not stored.startswith(HASH_SCHEME + "$"):
+        return True
+    return int(stored.split("$")[1]) < iterations
+
+def validate_username(username):
+    # Names double as workspace directory names, so no separators or dot names.
+    if not username or username in (".", "..") or any(c in username for c in ",\n/\\\0"):
+        raise ValueError("Username cannot be empty, '.' or '..', or contain commas, newlines or slashes.")
+
+class UserStore:
+    # users.txt stays an append-only "username,credential" file; a later line
+    # for the same user replaces an earlier one. The in-memory index is
+    # refreshed only when the file changes, reading just the appended tail
+    # when it has only grown. Writes take an exclusive lock on a side file
+    # so concurrent registrations cannot interleave or register twice.
+    def __init__(self, path="users.txt", iterations=DEFAULT_ITERATIONS):
+        self.path = path
+        self.iterations = iterations
+        self._users = {}
+        self._offset = 0
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._users, self._offset, self._stamp = {}, 0, None
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        if self._stamp is None or st.st_ino != self._stamp[0] or st.st_size < self._offset:
+            self._users, self._offset = {}, 0
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            tail = f.read()
+        # An unterminated last line is indexed but read again next time, in
+        # case it was still being written.
+        for line in tail.decode("utf-8").splitlines():
+            user, sep, credential = line.partition(",")
+            if sep:
+                self._users[user] = credential
+        self._offset += tail.rfind(b"\n") + 1
+        self._stamp = stamp
+
+    @contextmanager
+    def _write_lock(self):
+        with open(self.path + ".lock", "a+") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _append(self, username, credential):
+        # One O_APPEND write per line, made while holding the write lock.
+        line = f"{username},{credential}\n".encode()
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+        try:
+            size = os.fstat(fd).st_size
+            if size:
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    line = b"\n" + line  # older files may lack the final newline
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def exists(self, username):
+        with self._lock:
+            self._refresh()
+            return username in self._users
+
+    def register(self, username, password):
+        validate_username(username)
+        if "\n" in password:
+            raise ValueError("Password cannot contain newlines.")
+        credential = hash_password(password, self.iterations)
+        with self._lock, self._write_lock():
+            self._refresh()
+            if username in self._users:
+                return False
+            self._append(username, credential)
+            self._refresh()
+        return True
+
+    def check(self, username, password):
+        with self._lock:
+            self._refresh()
+            stored = self._users.get(username)
+        if stored is None or not verify_password(password, stored):
+            return False
+        if needs_rehash(stored, self.iterations):
+            # Upgrade plaintext or cheaper hashes the first time they are used.
+            with self._lock, self._write_lock():
+                self._refresh()
+                if self._users.get(username) == stored:
+                    self._append(username, hash_password(password, self.iterations))
+                    self._refresh()
+        return True
+
+    def compact(self):
+        # Rewrite the file with one line per user, dropping superseded ones.
+        with self._lock, self._write_lock():
+            self._refresh()
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                f.writelines(f"{user},{credential}\n" for user, credential in self._users.items())
+            os.replace(tmp, self.path)
+            self._refresh()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._users)
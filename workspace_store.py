@@ -0,0 +1,252 @@
+import errno
+import hashlib
+import os
+import sqlite3
+import threading
+
+import file_transfer
+from user_store import validate_username
+
+DEFAULT_QUOTA = int(os.environ.get("WORKSPACE_QUOTA_MB", 1024)) * 1024 * 1024
+
+# errno values from os.link meaning "this filesystem won't link it", not a real failure
+_NO_LINKS = {errno.EPERM, errno.EMLINK, errno.EXDEV, getattr(errno, "ENOTSUP", errno.EPERM),
+             getattr(errno, "EOPNOTSUPP", errno.EPERM)}
+
+class QuotaExceeded(Exception):
+    pass
+
+class WorkspaceStore:
+    # Each user gets a directory under root/users. Files there are hard links
+    # to read-only blobs under root/blobs named by their SHA-256. Identical
+    # content is stored once, a copy is just another link, and the link count
+    # tells when a blob is no longer used. meta.db maps blob inodes back to
+    # digests and keeps per-user byte/file totals. Every operation adjusts
+    # those totals, so quota checks never walk the tree; recount() repairs
+    # them if the tree was changed behind the store's back.
+    def __init__(self, root="workspaces", quota=DEFAULT_QUOTA):
+        self.root = os.path.abspath(root)
+        self.quota = quota
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.user_dir = os.path.join(self.root, "users")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        for d in (self.blob_dir, self.user_dir, self.tmp_dir):
+            os.makedirs(d, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.root, "meta.db"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS usage (user TEXT PRIMARY KEY, bytes INTEGER NOT NULL DEFAULT 0, "
+                         "files INTEGER NOT NULL DEFAULT 0, quota INTEGER)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, ino INTEGER NOT NULL, size INTEGER NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS blobs_ino ON blobs (ino)")
+
+    ######## Namespaces and accounting ##########
+    def user_root(self, user):
+        validate_username(user)
+        path = os.path.join(self.user_dir, user)
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO usage (user) VALUES (?)", (user,))
+        return path
+
+    def path(self, user, rel):
+        root = self.user_root(user)
+        path = os.path.normpath(os.path.join(root, rel))
+        if os.path.isabs(rel) or os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Path '{rel}' is outside your workspace.")
+        return path
+
+    def usage(self, user):
+        self.user_root(user)
+        used, files, quota = self._db.execute("SELECT bytes, files, quota FROM usage WHERE user = ?", (user,)).fetchone()
+        return {"bytes": used, "files": files, "quota": self.quota if quota is None else quota}
+
+    def set_quota(self, user, quota):
+        self.user_root(user)
+        with self._lock:
+            self._db.execute("UPDATE usage SET quota = ? WHERE user = ?", (quota, user))
+
+    def _charge(self, user, size, files):
+        # Caller holds the lock; the check and the update see the same total.
+        if size > 0:
+            usage = self.usage(user)
+            if usage["bytes"] + size > usage["quota"]:
+                raise QuotaExceeded(f"Quota exceeded: {usage['bytes'] + size} of {usage['quota']} bytes.")
+        self._db.execute("UPDATE usage SET bytes = bytes + ?, files = files + ? WHERE user = ?", (size, files, user))
+
+    def recount(self, user):
+        used = files = 0
+        for dirpath, _, names in os.walk(self.user_root(user)):
+            for name in names:
+                used += os.lstat(os.path.join(dirpath, name)).st_size
+                files += 1
+        with self._lock:
+            self._db.execute("UPDATE usage SET bytes = ?, files = ? WHERE user = ?", (used, files, user))
+        return self.usage(user)
+
+    ######## Blobs ##########
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _put(self, user, chunks, dest):
+        # Hash while writing to a temp file, keep the file only if its content
+        # is new, then link dest to the blob.
+        digest = hashlib.sha256()
+        tmp = os.path.join(self.tmp_dir, f"upload-{os.getpid()}-{threading.get_ident()}")
+        size = 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            name = digest.hexdigest()
+            blob = self._blob_path(name)
+            with self._lock:
+                if os.path.exists(blob):
+                    os.remove(tmp)
+                else:
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    if os.name != "nt":
+                        os.chmod(tmp, 0o444)  # links share the inode; nobody edits a blob in place
+                    os.replace(tmp, blob)
+                    self._db.execute("INSERT OR REPLACE INTO blobs (digest, ino, size) VALUES (?, ?, ?)",
+                                     (name, os.stat(blob).st_ino, size))
+                try:
+                    self._link(user, blob, dest, size)
+                except BaseException:
+                    self._release(os.stat(blob), 1)  # e.g. over quota: don't keep an unused blob
+                    raise
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return dest
+
+    def _release(self, st, links=2):
+        # st is the stat of a link that was just removed or replaced. If only
+        # the blob's own name was left besides it, the blob is garbage.
+        if st.st_nlink != links:
+            return
+        row = self._db.execute("SELECT digest FROM blobs WHERE ino = ?", (st.st_ino,)).fetchone()
+        if row is not None:
+            blob = self._blob_path(row[0])
+            try:
+                if os.stat(blob).st_ino == st.st_ino:
+                    os.remove(blob)
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM blobs WHERE digest = ?", (row[0],))
+
+    def _existing(self, path):
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return None
+        if os.path.isdir(path):
+            raise IsADirectoryError(errno.EISDIR, "Is a directory", path)
+        return st
+
+    def _link(self, user, source, dest, size):
+        # Point dest at source's inode, replacing whatever file was there.
+        with self._lock:
+            old = self._existing(dest)
+            if old and os.path.samestat(old, os.stat(source)):
+                return  # already this content; replacing a link with itself is a no-op rename
+            self._charge(user, size - (old.st_size if old else 0), 0 if old else 1)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = dest + f".link{os.getpid()}"
+            try:
+                os.link(source, tmp)
+                os.replace(tmp, dest)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                self._charge(user, (old.st_size if old else 0) - size, -1 if not old else 0)
+                raise
+            if old:
+                self._release(old)
+
+    ######## File operations (paths are relative to the user's workspace) ##########
+    def create(self, user, rel, content):
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        return self._put(user, [data], self.path(user, rel))
+
+    def upload(self, user, rel, fileobj, chunk_size=file_transfer.CHUNK_SIZE):
+        return self._put(user, iter(lambda: fileobj.read(chunk_size), b""), self.path(user, rel))
+
+    def delete(self, user, rel):
+        path = self.path(user, rel)
+        with self._lock:
+            st = self._existing(path)
+            if st is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file", rel)
+            os.remove(path)
+            self._charge(user, -st.st_size, -1)
+            self._release(st)
+        return path
+
+    def copy(self, user, src, dest, progress=None, cancel=None):
+        # A new link to the same blob; a real copy only if the filesystem
+        # refuses hard links.
+        source = self.path(user, src)
+        target = self.path(user, dest)
+        if os.path.isdir(target):
+            target = os.path.join(target, os.path.basename(source))
+        if os.path.isdir(source):
+            raise IsADirectoryError(errno.EISDIR, "Is a directory", src)
+        st = os.stat(source)
+        try:
+            self._link(user, source, target, st.st_size)
+        except OSError as e:
+            if e.errno not in _NO_LINKS:
+                raise
+            with self._lock:
+                old = self._existing(target)
+                self._charge(user, st.st_size - (old.st_size if old else 0), 0 if old else 1)
+            try:
+                file_transfer.copy_file(source, target, progress, cancel)
+            except BaseException:
+                with self._lock:
+                    self._charge(user, (old.st_size if old else 0) - st.st_size, 0 if old else -1)
+                raise
+            if old:
+                with self._lock:
+                    self._release(old)
+        if progress is not None:
+            progress(st.st_size, st.st_size)
+        return target
+
+    def move(self, user, src, dest):
+        # Within one workspace a move is always a rename: no bytes move.
+        source = self.path(user, src)
+        target = self.path(user, dest)
+        if os.path.isdir(target):
+            target = os.path.join(target, os.path.basename(source))
+        with self._lock:
+            if not os.path.lexists(source):
+                raise FileNotFoundError(errno.ENOENT, "No such file", src)
+            if source == target:
+                return target
+            old = None if os.path.isdir(source) else self._existing(target)
+            if old and os.path.samestat(old, os.lstat(source)):
+                # Two links to one inode: rename() would leave both in place.
+                os.remove(source)
+                self._charge(user, -old.st_size, -1)
+                return target
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+            if old:
+                self._charge(user, -old.st_size, -1)
+                self._release(old)
+        return target
+
+    def apply(self, user, op):
+        # One batch_ops operation inside the user's workspace.
+        kind = op["op"]
+        if kind == "create":
+            return self.create(user, op["src"], op["content"])
+        if kind == "delete":
+            return self.delete(user, op["src"])
+        if kind == "copy":
+            return self.copy(user, op["src"], op["dest"])
+        return self.move(user, op["src"], op["dest"])